@@ -0,0 +1,38 @@
+"""
+Celery configuration for background jobs.
+
+This module configures the Redis-backed Celery application whose workers
+deliver notifications outside the request cycle.
+
+Start a worker with:
+    celery -A app.config.celery_app worker -Q notifications
+"""
+
+import os
+from celery import Celery
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Celery configuration
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+CELERY_BROKER_URL = os.getenv("CELERY_BROKER_URL", REDIS_URL)
+
+celery_app = Celery(
+    "hr_ai_assistant",
+    broker=CELERY_BROKER_URL,
+    include=["app.tasks.notifications"]
+)
+
+celery_app.conf.update(
+    task_serializer="json",
+    accept_content=["json"],
+    # Acknowledge after the send so jobs from a crashed worker are redelivered
+    task_acks_late=True,
+    task_reject_on_worker_lost=True,
+    task_ignore_result=True,
+    task_routes={"app.tasks.notifications.*": {"queue": "notifications"}},
+    worker_prefetch_multiplier=1,
+    broker_connection_retry_on_startup=True
+)
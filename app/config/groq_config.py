@@ -6,10 +6,13 @@ HR AI Assistant's conversational AI capabilities.
 """
 
 import os
-from typing import Dict, Any, Optional, List
-from groq import Groq
+from typing import Dict, Any, Optional, List, TYPE_CHECKING
+import httpx
 from dotenv import load_dotenv
 
+if TYPE_CHECKING:
+    from groq import Groq, AsyncGroq
+
 # Load environment variables
 load_dotenv()
 
@@ -18,6 +21,10 @@ GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 GROQ_MODEL = os.getenv("GROQ_MODEL", "mixtral-8x7b-32768")
 GROQ_MAX_TOKENS = int(os.getenv("GROQ_MAX_TOKENS", "2048"))
 GROQ_TEMPERATURE = float(os.getenv("GROQ_TEMPERATURE", "0.7"))
+GROQ_MAX_CONNECTIONS = int(os.getenv("GROQ_MAX_CONNECTIONS", "100"))
+GROQ_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("GROQ_MAX_KEEPALIVE_CONNECTIONS", "50"))
+GROQ_TIMEOUT = float(os.getenv("GROQ_TIMEOUT", "30.0"))
+GROQ_CONNECT_TIMEOUT = float(os.getenv("GROQ_CONNECT_TIMEOUT", "5.0"))
 
 class GroqConfig:
     """Groq API configuration class"""
@@ -28,6 +35,7 @@ class GroqConfig:
         self.max_tokens = GROQ_MAX_TOKENS
         self.temperature = GROQ_TEMPERATURE
         self.client = None
+        self.async_client = None
         
         if not self.api_key:
             raise ValueError("GROQ_API_KEY environment variable is required")
@@ -38,6 +46,17 @@ class GroqConfig:
             "api_key": self.api_key
         }
     
+    def get_http_client_config(self) -> Dict[str, Any]:
+        """Get HTTP transport configuration shared by the sync and async clients"""
+        return {
+            "http2": True,
+            "limits": httpx.Limits(
+                max_connections=GROQ_MAX_CONNECTIONS,
+                max_keepalive_connections=GROQ_MAX_KEEPALIVE_CONNECTIONS
+            ),
+            "timeout": httpx.Timeout(GROQ_TIMEOUT, connect=GROQ_CONNECT_TIMEOUT)
+        }
+    
     def get_completion_config(self) -> Dict[str, Any]:
         """Get default completion configuration"""
         return {
@@ -52,7 +71,7 @@ class GroqConfig:
 # Global configuration instance
 groq_config = GroqConfig()
 
-def get_groq_client() -> Groq:
+def get_groq_client() -> "Groq":
     """
     Get Groq client instance.
     
@@ -61,7 +80,12 @@ def get_groq_client() -> Groq:
     """
     if groq_config.client is None:
         try:
-            groq_config.client = Groq(api_key=groq_config.api_key)
+            from groq import Groq
+            # Pooled HTTP/2 transport so TLS connections are reused across requests
+            groq_config.client = Groq(
+                api_key=groq_config.api_key,
+                http_client=httpx.Client(**groq_config.get_http_client_config())
+            )
             print("Groq client initialized successfully")
             
         except Exception as e:
@@ -70,6 +94,28 @@ def get_groq_client() -> Groq:
     
     return groq_config.client
 
+def get_async_groq_client() -> "AsyncGroq":
+    """
+    Get async Groq client instance.
+    
+    Returns:
+        AsyncGroq: Configured async Groq client
+    """
+    if groq_config.async_client is None:
+        try:
+            from groq import AsyncGroq
+            groq_config.async_client = AsyncGroq(
+                api_key=groq_config.api_key,
+                http_client=httpx.AsyncClient(**groq_config.get_http_client_config())
+            )
+            print("Async Groq client initialized successfully")
+            
+        except Exception as e:
+            print(f"Failed to initialize async Groq client: {e}")
+            raise e
+    
+    return groq_config.async_client
+
 def check_groq_connection() -> bool:
     """
     Check if Groq API connection is working.
@@ -89,6 +89,13 @@ async def lifespan(app: FastAPI):
     
     # Shutdown
     logger.info("Shutting down HR AI Assistant application...")
+    
+    from app.services.notification_service import notification_service
+    await notification_service.aclose()
+    notification_service.close()
+    
+    from app.services.document_service import document_service
+    document_service.close()
 
 # Create FastAPI application
 app = FastAPI(
@@ -6,14 +6,15 @@ and authorization for protected endpoints.
 """
 
 import os
+import time
 import jwt
-from datetime import datetime, timedelta
+from datetime import timedelta
 from typing import Optional, Dict, Any
 from fastapi import Request, HTTPException, Depends, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.responses import Response
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, joinedload
 
 from app.config.database import get_db
 from app.models.employee import Employee
@@ -143,14 +144,15 @@ def create_access_token(data: Dict[str, Any], expires_delta: Optional[timedelta]
     Returns:
         str: Encoded JWT token
     """
-    to_encode = data.copy()
-    
+    # NumericDate claims as integer seconds from a single clock read; this is
+    # what PyJWT would otherwise convert the datetimes to
+    issued_at = int(time.time())
     if expires_delta:
-        expire = datetime.utcnow() + expires_delta
+        expires_in = int(expires_delta.total_seconds())
     else:
-        expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+        expires_in = ACCESS_TOKEN_EXPIRE_MINUTES * 60
     
-    to_encode.update({"exp": expire, "iat": datetime.utcnow()})
+    to_encode = {**data, "exp": issued_at + expires_in, "iat": issued_at}
     
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
@@ -216,7 +218,10 @@ async def get_current_user(
             detail="Invalid token payload"
         )
     
-    user = db.query(Employee).filter(Employee.id == int(user_id)).first()
+    # Role is read by most authorization checks; load it with the user
+    user = db.query(Employee).options(
+        joinedload(Employee.role)
+    ).filter(Employee.id == int(user_id)).first()
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -7,13 +7,16 @@ document requests, and file management.
 
 from datetime import datetime
 from typing import Optional, List
-from sqlalchemy import Column, Integer, String, DateTime, Text, Boolean, ForeignKey, BigInteger, Enum
+from sqlalchemy import Column, Integer, String, DateTime, Text, Boolean, ForeignKey, BigInteger, Enum, Sequence
 from sqlalchemy.orm import relationship
 from sqlalchemy.ext.declarative import declarative_base
 import enum
 
 from app.config.database import Base
 
+# Sequence backing the numeric part of DocumentRequest.request_id
+document_request_seq = Sequence("document_request_seq", metadata=Base.metadata)
+
 class DocumentType(enum.Enum):
     """Document type enumeration"""
     POLICY = "policy"
@@ -68,6 +71,7 @@ class Document(Base):
     file_size = Column(BigInteger)  # Size in bytes
     file_extension = Column(String(10))
     mime_type = Column(String(100))
+    content_hash = Column(String(32), index=True)  # BLAKE2b-128 hex digest of file bytes
     
     # Content and metadata
     content_text = Column(Text)  # Extracted text content for search
@@ -194,15 +194,13 @@ class Employee(Base):
     
     def check_password(self, password: str) -> bool:
         """Check if provided password matches the stored hash"""
-        from passlib.context import CryptContext
-        pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-        return pwd_context.verify(password, self.password_hash)
+        from app.services.auth_service import auth_service
+        return auth_service.verify_password(password, self.password_hash)
     
     def set_password(self, password: str) -> None:
         """Set password hash for the employee"""
-        from passlib.context import CryptContext
-        pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-        self.password_hash = pwd_context.hash(password)
+        from app.services.auth_service import auth_service
+        self.password_hash = auth_service.hash_password(password)
     
     def to_dict(self) -> dict:
         """Convert employee to dictionary representation"""
@@ -7,7 +7,7 @@ leave types, and leave balance tracking.
 
 from datetime import datetime, date
 from typing import Optional
-from sqlalchemy import Column, Integer, String, DateTime, Date, Text, Boolean, ForeignKey, Numeric, Enum
+from sqlalchemy import Column, Integer, String, DateTime, Date, Text, Boolean, ForeignKey, Numeric, Enum, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from sqlalchemy.ext.declarative import declarative_base
 import enum
@@ -73,6 +73,10 @@ class LeaveBalance(Base):
     """Leave balance model for tracking employee leave balances"""
     
     __tablename__ = "leave_balances"
+    __table_args__ = (
+        # One balance row per employee, leave type and year (balance lookups)
+        UniqueConstraint("employee_id", "leave_type_id", "year", name="uk_leave_balances_unique"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     employee_id = Column(Integer, ForeignKey("employees.id"), nullable=False)
@@ -113,6 +117,12 @@ class LeaveRequest(Base):
     """Leave request model for employee leave applications"""
     
     __tablename__ = "leave_requests"
+    __table_args__ = (
+        # Overlap checks: employee + active status + date range
+        Index("idx_leave_requests_emp_status_dates", "employee_id", "status", "start_date", "end_date"),
+        # Annual usage: employee + leave type + status + start date range
+        Index("idx_leave_requests_emp_type_status", "employee_id", "leave_type_id", "status", "start_date"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     request_id = Column(String(20), unique=True, nullable=False, index=True)
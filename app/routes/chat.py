@@ -6,12 +6,14 @@ management, AI query processing, and chat analytics.
 """
 
 import secrets
+import orjson
 from datetime import datetime
 from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi.responses import StreamingResponse, ORJSONResponse
 from sqlalchemy.orm import Session
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Deque
 
-from app.config.database import get_db
+from app.config.database import get_db, SessionLocal
 from app.models.employee import Employee
 from app.models.query import ChatSession, QueryLog, SessionStatus, QueryStatus, QueryCategory
 from app.schemas.chat import (
@@ -19,13 +21,60 @@ from app.schemas.chat import (
     ChatSessionResponse, QueryLogResponse, ChatSearchParams, ChatAnalytics,
     ChatFeedback, ChatEscalation, AutocompleteResponse
 )
-from app.services.groq_service import groq_service
+from app.services.groq_service import groq_service, HISTORY_LENGTH
 from app.services.notification_service import notification_service
 from app.middleware.auth import get_current_active_user
 from app.utils.logger import get_logger
 
 logger = get_logger(__name__)
-router = APIRouter()
+# Chat payloads are the hottest responses in the API; encode them with orjson
+router = APIRouter(default_response_class=ORJSONResponse)
+
+def _get_conversation_history(db: Session, chat_session: ChatSession) -> Deque[Dict[str, str]]:
+    """Build the model conversation history from the session's recent queries"""
+    # Each query contributes a user and an assistant message
+    recent_queries = db.query(QueryLog).filter(
+        QueryLog.chat_session_id == chat_session.id
+    ).order_by(QueryLog.query_timestamp.desc()).limit(HISTORY_LENGTH // 2).all()
+    
+    conversation_history = groq_service.new_history()
+    for query in reversed(recent_queries):
+        conversation_history.extend([
+            {"role": "user", "content": query.user_query},
+            {"role": "assistant", "content": query.ai_response}
+        ])
+    return conversation_history
+
+def _create_query_log(chat_session: ChatSession, current_user: Employee, content: str,
+                      ai_response_data: Dict[str, Any]) -> QueryLog:
+    """Build the QueryLog entry for an answered chat message"""
+    query_log = QueryLog(
+        chat_session_id=chat_session.id,
+        employee_id=current_user.id,
+        user_query=content,
+        ai_response=ai_response_data["message"],
+        query_category=ai_response_data.get("intent", QueryCategory.GENERAL_HR),
+        intent_detected=ai_response_data.get("intent", QueryCategory.GENERAL_HR).value,
+        processing_time_ms=ai_response_data.get("processing_time_ms", 0),
+        tokens_used=ai_response_data.get("tokens_used", 0),
+        model_used=ai_response_data.get("model_used", ""),
+        confidence_score=ai_response_data.get("confidence_score", 0),
+        context_retrieved=ai_response_data.get("context_used", False),
+        rag_score=ai_response_data.get("rag_score", 0),
+        complexity_level=ai_response_data.get("complexity_level", "medium"),
+        status=QueryStatus.ESCALATED if ai_response_data.get("requires_escalation") else QueryStatus.ANSWERED,
+        requires_escalation=ai_response_data.get("requires_escalation", False),
+        escalation_reason=ai_response_data.get("escalation_reason"),
+        user_sentiment=ai_response_data.get("sentiment"),
+        sentiment_score=ai_response_data.get("sentiment_score", 0)
+    )
+    
+    # Set documents used for RAG
+    if ai_response_data.get("context_sources"):
+        doc_ids = [source.get("document_id") for source in ai_response_data["context_sources"] if source.get("document_id")]
+        query_log.set_documents_used(doc_ids)
+    
+    return query_log
 
 @router.post("/sessions", response_model=ChatSessionResponse)
 async def create_chat_session(
@@ -113,19 +162,10 @@ async def send_message(
             )
         
         # Get conversation history for context
-        recent_queries = db.query(QueryLog).filter(
-            QueryLog.chat_session_id == chat_session.id
-        ).order_by(QueryLog.query_timestamp.desc()).limit(10).all()
-        
-        conversation_history = []
-        for query in reversed(recent_queries):
-            conversation_history.extend([
-                {"role": "user", "content": query.user_query},
-                {"role": "assistant", "content": query.ai_response}
-            ])
+        conversation_history = _get_conversation_history(db, chat_session)
         
         # Generate AI response
-        ai_response_data = groq_service.generate_response(
+        ai_response_data = await groq_service.agenerate_response(
             query=message.content,
             user=current_user,
             conversation_history=conversation_history,
@@ -133,31 +173,7 @@ async def send_message(
         )
         
         # Create query log
-        query_log = QueryLog(
-            chat_session_id=chat_session.id,
-            employee_id=current_user.id,
-            user_query=message.content,
-            ai_response=ai_response_data["message"],
-            query_category=ai_response_data.get("intent", QueryCategory.GENERAL_HR),
-            intent_detected=ai_response_data.get("intent", QueryCategory.GENERAL_HR).value,
-            processing_time_ms=ai_response_data.get("processing_time_ms", 0),
-            tokens_used=ai_response_data.get("tokens_used", 0),
-            model_used=ai_response_data.get("model_used", ""),
-            confidence_score=ai_response_data.get("confidence_score", 0),
-            context_retrieved=ai_response_data.get("context_used", False),
-            rag_score=ai_response_data.get("rag_score", 0),
-            complexity_level=ai_response_data.get("complexity_level", "medium"),
-            status=QueryStatus.ESCALATED if ai_response_data.get("requires_escalation") else QueryStatus.ANSWERED,
-            requires_escalation=ai_response_data.get("requires_escalation", False),
-            escalation_reason=ai_response_data.get("escalation_reason"),
-            user_sentiment=ai_response_data.get("sentiment"),
-            sentiment_score=ai_response_data.get("sentiment_score", 0)
-        )
-        
-        # Set documents used for RAG
-        if ai_response_data.get("context_sources"):
-            doc_ids = [source.get("document_id") for source in ai_response_data["context_sources"] if source.get("document_id")]
-            query_log.set_documents_used(doc_ids)
+        query_log = _create_query_log(chat_session, current_user, message.content, ai_response_data)
         
         db.add(query_log)
         
@@ -203,6 +219,90 @@ async def send_message(
             detail="Failed to process message"
         )
 
+@router.post("/sessions/{session_id}/messages/stream")
+async def stream_message(
+    session_id: str,
+    message: ChatMessage,
+    current_user: Employee = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Send a message in chat session and stream the AI response as server-sent events
+    
+    Args:
+        session_id: Chat session ID
+        message: User message
+        current_user: Current authenticated user
+        db: Database session
+        
+    Returns:
+        StreamingResponse: metadata, delta and done events (see GroqService.generate_response_stream)
+    """
+    chat_session = db.query(ChatSession).filter(
+        ChatSession.session_id == session_id,
+        ChatSession.employee_id == current_user.id
+    ).first()
+    
+    if not chat_session:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Chat session not found"
+        )
+    
+    if chat_session.status != SessionStatus.ACTIVE:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Chat session is not active"
+        )
+    
+    conversation_history = _get_conversation_history(db, chat_session)
+    chat_session_id = chat_session.id
+    
+    def event_stream():
+        for frame in groq_service.generate_response_stream(
+            query=message.content,
+            user=current_user,
+            conversation_history=conversation_history,
+            use_rag=True
+        ):
+            if frame["type"] == "done":
+                ai_response_data = frame["response"]
+                
+                # The request's session is closed once streaming starts
+                log_db = SessionLocal()
+                try:
+                    log_session = log_db.query(ChatSession).filter(ChatSession.id == chat_session_id).first()
+                    query_log = _create_query_log(log_session, current_user, message.content, ai_response_data)
+                    log_db.add(query_log)
+                    log_session.increment_message_count(is_user_message=True)
+                    log_session.increment_message_count(is_user_message=False)
+                    log_db.commit()
+                    frame = {
+                        "type": "done",
+                        "session_id": session_id,
+                        "query_id": query_log.id,
+                        "confidence_score": ai_response_data.get("confidence_score"),
+                        "processing_time_ms": ai_response_data.get("processing_time_ms"),
+                        "context_used": ai_response_data.get("context_used", False),
+                        "documents_referenced": [
+                            source.get("title", "") for source in ai_response_data.get("context_sources", [])
+                        ],
+                        "suggested_actions": ai_response_data.get("suggested_actions", []),
+                        "requires_escalation": ai_response_data.get("requires_escalation", False),
+                        "escalation_reason": ai_response_data.get("escalation_reason"),
+                        "metadata": ai_response_data.get("metadata", {})
+                    }
+                except Exception as e:
+                    log_db.rollback()
+                    logger.error(f"Error logging streamed chat message: {e}")
+                    frame = {"type": "error", "detail": "Failed to process message"}
+                finally:
+                    log_db.close()
+            
+            yield b"data: " + orjson.dumps(frame, default=str) + b"\n\n"
+    
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
 @router.get("/sessions", response_model=List[ChatSessionResponse])
 async def get_chat_sessions(
     search_params: ChatSearchParams = Depends(),
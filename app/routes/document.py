@@ -6,7 +6,7 @@ requests, downloads, and document management operations.
 """
 
 import os
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form, Query
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status, UploadFile, File, Form, Query
 from fastapi.responses import FileResponse
 from sqlalchemy.orm import Session
 from sqlalchemy import and_, or_
@@ -31,6 +31,7 @@ router = APIRouter()
 
 @router.post("/upload", response_model=DocumentResponse)
 async def upload_document(
+    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
     title: str = Form(...),
     description: Optional[str] = Form(None),
@@ -45,6 +46,7 @@ async def upload_document(
     Upload a new document (HR only)
     
     Args:
+        background_tasks: Background tasks for text extraction and indexing
         file: Uploaded file
         title: Document title
         description: Document description
@@ -59,6 +61,13 @@ async def upload_document(
         DocumentResponse: Uploaded document information
     """
     try:
+        # Reject oversized uploads before touching the file
+        if file.size is not None and file.size > document_service.max_file_size:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"File size ({file.size} bytes) exceeds maximum allowed size ({document_service.max_file_size} bytes)"
+            )
+        
         # Prepare metadata
         metadata = {
             "title": title,
@@ -71,7 +80,7 @@ async def upload_document(
         
         # Process file upload
         success, document, errors = document_service.process_uploaded_file(
-            db, file.file, file.filename, current_user, **metadata
+            db, file.file, file.filename, current_user, file_size=file.size, **metadata
         )
         
         if not success:
@@ -80,6 +89,9 @@ async def upload_document(
                 detail=f"Upload failed: {', '.join(errors)}"
             )
         
+        # Extract text and index for search after the response is sent
+        background_tasks.add_task(document_service.index_uploaded_document, document.id)
+        
         logger.info(f"Document uploaded: {document.id} by {current_user.employee_id}")
         
         return DocumentResponse.from_orm(document)
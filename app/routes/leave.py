@@ -7,7 +7,7 @@ approvals, balances, and leave management operations.
 
 from datetime import date
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, joinedload
 from sqlalchemy import and_, or_
 from typing import List, Dict, Any, Optional
 
@@ -18,7 +18,7 @@ from app.schemas.leave import (
     LeaveRequestCreate, LeaveRequestUpdate, LeaveRequestResponse,
     LeaveTypeCreate, LeaveTypeUpdate, LeaveTypeResponse,
     LeaveBalanceResponse, LeaveRequestSearchParams, LeaveApprovalAction,
-    LeaveCancellation, LeaveStatistics, LeavePolicyValidation
+    LeaveCancellation, LeaveBulkCancellation, LeaveStatistics, LeavePolicyValidation
 )
 from app.services.leave_service import leave_service
 from app.services.notification_service import notification_service
@@ -28,6 +28,27 @@ from app.utils.logger import get_logger
 logger = get_logger(__name__)
 router = APIRouter()
 
+def _get_leave_request_for_action(db: Session, request_id: str) -> Optional[LeaveRequest]:
+    """
+    Fetch a leave request with the relationships its workflow actions read
+    
+    Update, approve, reject and cancel all dereference the employee and
+    leave type; loading them in the same SELECT avoids per-access lazy loads.
+    
+    Args:
+        db: Database session
+        request_id: Leave request ID
+        
+    Returns:
+        Optional[LeaveRequest]: Leave request, or None if not found
+    """
+    return db.query(LeaveRequest).options(
+        joinedload(LeaveRequest.employee),
+        joinedload(LeaveRequest.leave_type)
+    ).filter(
+        LeaveRequest.request_id == request_id
+    ).first()
+
 # Leave Request Routes
 
 @router.post("/requests", response_model=LeaveRequestResponse)
@@ -252,9 +273,7 @@ async def update_leave_request(
         LeaveRequestResponse: Updated leave request
     """
     try:
-        leave_request = db.query(LeaveRequest).filter(
-            LeaveRequest.request_id == request_id
-        ).first()
+        leave_request = _get_leave_request_for_action(db, request_id)
         
         if not leave_request:
             raise HTTPException(
@@ -306,9 +325,7 @@ async def approve_leave_request(
         Dict: Approval confirmation
     """
     try:
-        leave_request = db.query(LeaveRequest).filter(
-            LeaveRequest.request_id == request_id
-        ).first()
+        leave_request = _get_leave_request_for_action(db, request_id)
         
         if not leave_request:
             raise HTTPException(
@@ -389,9 +406,7 @@ async def cancel_leave_request(
         Dict: Cancellation confirmation
     """
     try:
-        leave_request = db.query(LeaveRequest).filter(
-            LeaveRequest.request_id == request_id
-        ).first()
+        leave_request = _get_leave_request_for_action(db, request_id)
         
         if not leave_request:
             raise HTTPException(
@@ -422,6 +437,43 @@ async def cancel_leave_request(
             detail="Failed to cancel leave request"
         )
 
+@router.post("/requests/bulk-cancel")
+async def bulk_cancel_leave_requests(
+    cancellation_data: LeaveBulkCancellation,
+    current_user: Employee = Depends(require_role("hr")),
+    db: Session = Depends(get_db)
+):
+    """
+    Cancel multiple leave requests at once (HR only)
+    
+    Args:
+        cancellation_data: Request IDs and cancellation reason
+        current_user: Current authenticated user (must be HR)
+        db: Database session
+        
+    Returns:
+        Dict: Number of cancelled requests and per-request errors
+    """
+    try:
+        cancelled, errors = leave_service.bulk_cancel_leave_requests(
+            db, cancellation_data.request_ids, cancellation_data.reason, current_user
+        )
+        
+        logger.info(f"Bulk cancellation by {current_user.employee_id}: {cancelled} cancelled")
+        
+        return {
+            "message": f"{cancelled} leave requests cancelled",
+            "cancelled": cancelled,
+            "errors": errors
+        }
+        
+    except Exception as e:
+        logger.error(f"Error bulk cancelling leave requests: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to cancel leave requests"
+        )
+
 @router.post("/requests/validate", response_model=LeavePolicyValidation)
 async def validate_leave_policy(
     leave_type_id: int,
@@ -363,7 +363,7 @@ async def publish_survey(
             }
             
             # Send bulk invitations
-            notification_service.send_bulk_notifications(
+            await notification_service.send_bulk_notifications_async(
                 target_employees, "survey_invitation", survey_data
             )
             
@@ -216,6 +216,10 @@ class LeaveHRApproval(LeaveApprovalAction):
 class LeaveCancellation(BaseModel):
     reason: str = Field(..., min_length=10, max_length=500)
 
+class LeaveBulkCancellation(BaseModel):
+    request_ids: List[str] = Field(..., min_items=1, max_items=5000)
+    reason: str = Field(..., min_length=10, max_length=500)
+
 # Leave Search and Filter Schemas
 class LeaveRequestSearchParams(BaseModel):
     employee_id: Optional[int] = None
@@ -0,0 +1,5 @@
+"""
+Build and maintenance scripts for the HR AI Assistant.
+
+Run with ``python -m app.scripts.<name>``.
+"""
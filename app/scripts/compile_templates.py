@@ -0,0 +1,41 @@
+"""
+Ahead-of-time compilation of the notification email templates.
+
+Compiles app/templates/notifications/*.html into Python modules packed in
+app/templates/compiled.zip. NotificationService loads them through
+jinja2.ModuleLoader when the archive is newer than every template, so
+rendering skips template parsing and per-lookup filesystem checks.
+
+Usage:
+    python -m app.scripts.compile_templates
+"""
+
+from pathlib import Path
+from jinja2 import Environment, FileSystemLoader
+
+TEMPLATES_ROOT = Path(__file__).resolve().parent.parent / "templates"
+NOTIFICATION_TEMPLATE_DIR = TEMPLATES_ROOT / "notifications"
+COMPILED_TEMPLATES_PATH = TEMPLATES_ROOT / "compiled.zip"
+
+def compile_notification_templates() -> Path:
+    """
+    Compile all notification templates into a zip of Python modules
+    
+    Returns:
+        Path: Path of the compiled archive
+    """
+    # Must match the NotificationService environment options
+    env = Environment(
+        loader=FileSystemLoader(str(NOTIFICATION_TEMPLATE_DIR)),
+        autoescape=True
+    )
+    env.compile_templates(
+        str(COMPILED_TEMPLATES_PATH),
+        zip="deflated",
+        ignore_errors=False
+    )
+    return COMPILED_TEMPLATES_PATH
+
+if __name__ == "__main__":
+    path = compile_notification_templates()
+    print(f"Compiled notification templates to {path}")
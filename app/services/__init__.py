@@ -5,13 +5,25 @@ This package contains all business logic services including authentication,
 AI processing, document management, and notification services.
 """
 
-from .auth_service import AuthService
-from .rag_service import RAGService
-from .groq_service import GroqService
-from .leave_service import LeaveService
-from .document_service import DocumentService
-# from .survey_service import SurveyService
-# from .notification_service import NotificationService
+import importlib
+
+# Service classes are imported on first access so that importing one service
+# does not load the heavy dependencies (embeddings, Groq SDK) of the others
+_SERVICE_MODULES = {
+    "AuthService": ".auth_service",
+    "RAGService": ".rag_service",
+    "GroqService": ".groq_service",
+    "LeaveService": ".leave_service",
+    "DocumentService": ".document_service",
+    # "SurveyService": ".survey_service",
+    # "NotificationService": ".notification_service",
+}
+
+def __getattr__(name: str):
+    module_name = _SERVICE_MODULES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(importlib.import_module(module_name, __name__), name)
 
 __all__ = [
     "AuthService",
@@ -10,9 +10,9 @@ import secrets
 import hashlib
 from datetime import datetime, timedelta
 from typing import Optional, Dict, Any, Tuple
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, selectinload
 from sqlalchemy import and_
-from passlib.context import CryptContext
+import bcrypt
 from email_validator import validate_email, EmailNotValidError
 
 from app.models.employee import Employee, EmploymentStatus
@@ -22,16 +22,26 @@ from app.schemas.employee import EmployeeCreate, EmployeeLogin
 
 logger = get_logger(__name__)
 
+# bcrypt work factor used for new password hashes
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+
+# Static claims shared by every refresh / refreshed access token
+_REFRESH_TOKEN_CLAIMS = {"type": "refresh"}
+_ACCESS_TOKEN_CLAIMS = {"type": "access"}
+
+# Passwords rejected outright by validate_password_strength
+COMMON_PASSWORDS = frozenset({"password", "123456", "password123", "admin", "qwerty"})
+
 class AuthService:
     """Authentication service for user management and security"""
     
     def __init__(self):
-        # Password hashing configuration
-        self.pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-        
         # Token configuration
         self.access_token_expire_minutes = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
         self.refresh_token_expire_days = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "7"))
+        self._access_expires_s = self.access_token_expire_minutes * 60
+        self._access_delta = timedelta(minutes=self.access_token_expire_minutes)
+        self._refresh_delta = timedelta(days=self.refresh_token_expire_days)
         
         # Password reset configuration
         self.reset_token_expire_hours = int(os.getenv("RESET_TOKEN_EXPIRE_HOURS", "1"))
@@ -56,7 +66,7 @@ class AuthService:
         Returns:
             str: Hashed password
         """
-        return self.pwd_context.hash(password)
+        return bcrypt.hashpw(password.encode(), bcrypt.gensalt(rounds=BCRYPT_ROUNDS)).decode()
     
     def verify_password(self, plain_password: str, hashed_password: str) -> bool:
         """
@@ -69,7 +79,11 @@ class AuthService:
         Returns:
             bool: True if password matches, False otherwise
         """
-        return self.pwd_context.verify(plain_password, hashed_password)
+        try:
+            return bcrypt.checkpw(plain_password.encode(), hashed_password.encode())
+        except ValueError:
+            # Malformed or non-bcrypt hash
+            return False
     
     def validate_password_strength(self, password: str) -> Tuple[bool, list]:
         """
@@ -105,8 +119,7 @@ class AuthService:
             errors.append("Password must contain at least one special character")
         
         # Common password check (basic)
-        common_passwords = ["password", "123456", "password123", "admin", "qwerty"]
-        if password.lower() in common_passwords:
+        if password.lower() in COMMON_PASSWORDS:
             errors.append("Password is too common")
         
         return len(errors) == 0, errors
@@ -128,8 +141,12 @@ class AuthService:
             logger.warning(f"Login attempt on locked account: {username}")
             return None
         
-        # Find user by username or email
-        user = db.query(Employee).filter(
+        # Find user by username or email; role and department are loaded up
+        # front because create_user_tokens reads both
+        user = db.query(Employee).options(
+            selectinload(Employee.role),
+            selectinload(Employee.department)
+        ).filter(
             and_(
                 (Employee.username == username) | (Employee.email == username),
                 Employee.is_active == True,
@@ -168,39 +185,39 @@ class AuthService:
         Returns:
             Dict: Token information
         """
+        subject = str(user.id)
+        role = user.role.title if user.role else None
+        department = user.department.name if user.department else None
+        
         # Create access token
         access_token_data = {
-            "sub": str(user.id),
+            "sub": subject,
             "username": user.username,
             "employee_id": user.employee_id,
             "email": user.email,
-            "role": user.role.title if user.role else None,
-            "department": user.department.name if user.department else None
+            "role": role,
+            "department": department
         }
         
         access_token = create_access_token(
             data=access_token_data,
-            expires_delta=timedelta(minutes=self.access_token_expire_minutes)
+            expires_delta=self._access_delta
         )
         
         # Create refresh token
-        refresh_token_data = {
-            "sub": str(user.id),
-            "type": "refresh"
-        }
-        
         refresh_token = create_access_token(
-            data=refresh_token_data,
-            expires_delta=timedelta(days=self.refresh_token_expire_days)
+            data={"sub": subject, **_REFRESH_TOKEN_CLAIMS},
+            expires_delta=self._refresh_delta
         )
         
         # Store session information
         session_id = secrets.token_urlsafe(32)
+        now = datetime.utcnow()
         self.active_sessions[session_id] = {
             "user_id": user.id,
             "username": user.username,
-            "created_at": datetime.utcnow(),
-            "last_activity": datetime.utcnow(),
+            "created_at": now,
+            "last_activity": now,
             "access_token": access_token
         }
         
@@ -208,7 +225,7 @@ class AuthService:
             "access_token": access_token,
             "refresh_token": refresh_token,
             "token_type": "bearer",
-            "expires_in": self.access_token_expire_minutes * 60,
+            "expires_in": self._access_expires_s,
             "session_id": session_id,
             "user": {
                 "id": user.id,
@@ -216,8 +233,8 @@ class AuthService:
                 "employee_id": user.employee_id,
                 "email": user.email,
                 "full_name": user.full_name,
-                "role": user.role.title if user.role else None,
-                "department": user.department.name if user.department else None
+                "role": role,
+                "department": department
             }
         }
     
@@ -241,20 +258,15 @@ class AuthService:
             return None
         
         # Create new access token
-        access_token_data = {
-            "sub": user_id,
-            "type": "access"
-        }
-        
         access_token = create_access_token(
-            data=access_token_data,
-            expires_delta=timedelta(minutes=self.access_token_expire_minutes)
+            data={"sub": user_id, **_ACCESS_TOKEN_CLAIMS},
+            expires_delta=self._access_delta
         )
         
         return {
             "access_token": access_token,
             "token_type": "bearer",
-            "expires_in": self.access_token_expire_minutes * 60
+            "expires_in": self._access_expires_s
         }
     
     def logout_user(self, session_id: str) -> bool:
@@ -290,15 +302,17 @@ class AuthService:
         if not self.verify_password(current_password, user.password_hash):
             return False, ["Current password is incorrect"]
         
+        # Check if new password is different from current. current_password has
+        # just been verified against the stored hash, so comparing plaintexts
+        # is equivalent to a second bcrypt verification.
+        if secrets.compare_digest(new_password.encode(), current_password.encode()):
+            return False, ["New password must be different from current password"]
+        
         # Validate new password strength
         is_valid, errors = self.validate_password_strength(new_password)
         if not is_valid:
             return False, errors
         
-        # Check if new password is different from current
-        if self.verify_password(new_password, user.password_hash):
-            return False, ["New password must be different from current password"]
-        
         # Update password
         user.password_hash = self.hash_password(new_password)
         user.updated_at = datetime.utcnow()
@@ -320,7 +334,8 @@ class AuthService:
         token = secrets.token_urlsafe(32)
         expires_at = datetime.utcnow() + timedelta(hours=self.reset_token_expire_hours)
         
-        self.reset_tokens[token] = {
+        # Only the token digest is stored, so lookups never compare raw tokens
+        self.reset_tokens[self._hash_reset_token(token)] = {
             "email": email,
             "expires_at": expires_at,
             "used": False
@@ -329,6 +344,11 @@ class AuthService:
         logger.info(f"Password reset token generated for email: {email}")
         return token
     
+    @staticmethod
+    def _hash_reset_token(token: str) -> bytes:
+        """Return the SHA-256 digest used as the storage key for a reset token"""
+        return hashlib.sha256(token.encode()).digest()
+    
     def validate_reset_token(self, token: str) -> Optional[str]:
         """
         Validate password reset token
@@ -339,14 +359,14 @@ class AuthService:
         Returns:
             Optional[str]: Email if token is valid, None otherwise
         """
-        if token not in self.reset_tokens:
+        token_key = self._hash_reset_token(token)
+        token_data = self.reset_tokens.get(token_key)
+        if token_data is None:
             return None
         
-        token_data = self.reset_tokens[token]
-        
         # Check if token is expired
         if datetime.utcnow() > token_data["expires_at"]:
-            del self.reset_tokens[token]
+            del self.reset_tokens[token_key]
             return None
         
         # Check if token is already used
@@ -388,7 +408,7 @@ class AuthService:
         db.commit()
         
         # Mark token as used
-        self.reset_tokens[token]["used"] = True
+        self.reset_tokens[self._hash_reset_token(token)]["used"] = True
         
         logger.info(f"Password reset for user: {user.username}")
         return True, []
@@ -4,34 +4,148 @@ Document management service for the HR AI Assistant.
 This service handles document processing, file management, and document requests.
 """
 
+import io
 import os
+import hashlib
+import shutil
 import secrets
+import tempfile
 import mimetypes
+import threading
+import zipfile
+import multiprocessing
+import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
-from typing import List, Dict, Any, Optional, Tuple, BinaryIO
+from typing import List, Dict, Any, Optional, Tuple, BinaryIO, Callable
 from pathlib import Path
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 
-from app.models.document import Document, DocumentRequest, DocumentStatus, RequestStatus
+from app.models.document import Document, DocumentRequest, DocumentStatus, RequestStatus, document_request_seq
 from app.models.employee import Employee
 from app.services.rag_service import rag_service
 from app.utils.logger import get_logger
 
 logger = get_logger(__name__)
 
+# Optional PDF backends: MuPDF is preferred, PyPDF2 is the pure-Python fallback
+try:
+    import pymupdf
+except ImportError:
+    pymupdf = None
+
+try:
+    import PyPDF2
+except ImportError:
+    PyPDF2 = None
+
+# PDFs above either threshold are extracted in a separate process so a single
+# large upload cannot monopolise the interpreter
+PDF_OFFLOAD_SIZE = int(os.getenv("PDF_OFFLOAD_SIZE", "5242880"))
+PDF_OFFLOAD_PAGES = int(os.getenv("PDF_OFFLOAD_PAGES", "50"))
+
+# Extraction workers are started from a clean process rather than forked from
+# the threaded server, which could copy held locks into the child
+EXTRACTION_START_METHOD = (
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+)
+
+# MIME types for the extensions we accept; mimetypes is only consulted for
+# extensions added through ALLOWED_EXTENSIONS that are not listed here
+MIME_TYPES = {
+    ".pdf": "application/pdf",
+    ".docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    ".doc": "application/msword",
+    ".txt": "text/plain",
+    ".xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    ".xls": "application/vnd.ms-excel",
+    ".csv": "text/csv",
+}
+
+_WORD_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_WORD_TEXT = f"{_WORD_NS}t"
+_WORD_TAB = f"{_WORD_NS}tab"
+_WORD_PARAGRAPH = f"{_WORD_NS}p"
+
+def _extract_pdf_text_sync(file_path: str) -> str:
+    """Extract text from PDF file (module-level so it can run in a worker process)"""
+    if pymupdf is not None:
+        with pymupdf.open(file_path) as doc:
+            return "\n".join(page.get_text() for page in doc)
+    
+    if PyPDF2 is not None:
+        with open(file_path, "rb") as f:
+            reader = PyPDF2.PdfReader(f)
+            return "\n".join(page.extract_text() or "" for page in reader.pages)
+    
+    raise ImportError("Neither pymupdf nor PyPDF2 is installed")
+
+def _extract_small_pdf_text(file_path: Path) -> Optional[str]:
+    """
+    Extract text from a PDF below PDF_OFFLOAD_SIZE in the calling thread
+    
+    The page count is checked on the same open document that is extracted,
+    so the file is parsed once. Returns None if the PDF has more than
+    PDF_OFFLOAD_PAGES pages and should be extracted in a worker process.
+    """
+    if pymupdf is None:
+        return _extract_pdf_text_sync(str(file_path))
+    
+    with pymupdf.open(file_path) as doc:
+        if doc.page_count > PDF_OFFLOAD_PAGES:
+            return None
+        return "\n".join(page.get_text() for page in doc)
+
 class DocumentService:
     """Document management service"""
     
     def __init__(self):
         self.upload_directory = Path(os.getenv("UPLOAD_DIRECTORY", "./uploads"))
         self.max_file_size = int(os.getenv("MAX_FILE_SIZE", "10485760")) 
-        self.allowed_extensions = os.getenv("ALLOWED_EXTENSIONS", ".pdf,.docx,.txt,.xlsx").split(",")
+        self.allowed_extensions = frozenset(
+            ext.strip().lower() for ext in os.getenv("ALLOWED_EXTENSIONS", ".pdf,.docx,.txt,.xlsx").split(",")
+        )
+        self._mime_map = {
+            ext: MIME_TYPES.get(ext) or mimetypes.guess_type(f"file{ext}")[0]
+            for ext in self.allowed_extensions
+        }
         
         # Ensure upload directory exists
         self.upload_directory.mkdir(parents=True, exist_ok=True)
+        
+        # Process pool for large PDF extraction, created on first use
+        self._process_pool: Optional[ProcessPoolExecutor] = None
+        self._process_pool_lock = threading.Lock()
+        
+        # Text extractors by file extension
+        self._extractors: Dict[str, Callable[[Path], str]] = {
+            ".txt": self._extract_txt_text,
+            ".pdf": self._extract_pdf_text,
+            ".docx": self._extract_docx_text,
+        }
+    
+    def _get_process_pool(self) -> ProcessPoolExecutor:
+        """Get (lazily creating) the process pool used for heavy extraction"""
+        if self._process_pool is None:
+            with self._process_pool_lock:
+                if self._process_pool is None:
+                    self._process_pool = ProcessPoolExecutor(
+                        max_workers=int(os.getenv("EXTRACTION_WORKERS", "2")),
+                        mp_context=multiprocessing.get_context(EXTRACTION_START_METHOD)
+                    )
+        return self._process_pool
+    
+    def close(self):
+        """Shut down the extraction process pool if it was started"""
+        with self._process_pool_lock:
+            pool, self._process_pool = self._process_pool, None
+        if pool is not None:
+            pool.shutdown(wait=True)
     
     def process_uploaded_file(self, db: Session, file: BinaryIO, filename: str, 
-                            author: Employee, **metadata) -> Tuple[bool, Optional[Document], List[str]]:
+                            author: Employee, file_size: Optional[int] = None,
+                            **metadata) -> Tuple[bool, Optional[Document], List[str]]:
         """
         Process uploaded file and create document record
         
@@ -40,6 +154,7 @@ class DocumentService:
             file: File object
             filename: Original filename
             author: User uploading the file
+            file_size: Upload size in bytes if already known (e.g. UploadFile.size)
             **metadata: Additional document metadata
             
         Returns:
@@ -47,25 +162,38 @@ class DocumentService:
         """
         try:
             # Validate file
-            validation_result = self._validate_file(file, filename)
+            if file_size is None:
+                file_size = self._get_file_size(file)
+            validation_result = self._validate_file(filename, file_size)
             if not validation_result[0]:
                 return False, None, validation_result[1]
             
-            # Generate unique filename
+            # Identical content already stored: the new record shares its file
+            # and extracted text instead of saving and extracting the same bytes
+            # again. It is still indexed under its own id, since index entries
+            # carry each document's own title, author and access level.
+            content_hash = self._hash_upload(file)
             file_extension = Path(filename).suffix.lower()
-            unique_filename = f"{secrets.token_hex(16)}{file_extension}"
-            file_path = self.upload_directory / unique_filename
-            
-            # Save file
-            file.seek(0)
-            with open(file_path, "wb") as f:
-                f.write(file.read())
+            existing = db.query(
+                Document.id, Document.file_path, Document.content_text
+            ).filter(
+                Document.content_hash == content_hash,
+                Document.file_extension == file_extension,
+                Document.is_active == True
+            ).first()
             
-            file_size = file_path.stat().st_size
-            mime_type, _ = mimetypes.guess_type(filename)
+            if existing:
+                logger.info(f"Duplicate upload of document {existing.id} ({filename}), reusing stored file")
+                file_path = existing.file_path
+            else:
+                # Generate unique filename
+                unique_filename = f"{secrets.token_hex(16)}{file_extension}"
+                file_path = self.upload_directory / unique_filename
+                
+                # Save file
+                self._save_file(file, file_path)
             
-            # Extract text content
-            content_text = self._extract_text_content(file_path, file_extension)
+            mime_type = self._mime_map.get(file_extension)
             
             # Create document record
             document = Document(
@@ -77,7 +205,8 @@ class DocumentService:
                 file_size=file_size,
                 file_extension=file_extension,
                 mime_type=mime_type,
-                content_text=content_text,
+                content_hash=content_hash,
+                content_text=existing.content_text if existing else None,
                 keywords=metadata.get("keywords"),
                 tags=metadata.get("tags"),
                 version=metadata.get("version", "1.0"),
@@ -91,36 +220,125 @@ class DocumentService:
             db.commit()
             db.refresh(document)
             
+            # Text extraction and search indexing are deferred to
+            # index_uploaded_document so the upload request returns immediately
+            logger.info(f"Document uploaded successfully: {document.id}")
+            return True, document, []
+            
+        except Exception as e:
+            logger.error(f"Error processing uploaded file: {e}")
+            return False, None, [f"Error processing file: {str(e)}"]
+    
+    def index_uploaded_document(self, document_id: int) -> bool:
+        """
+        Extract text from an uploaded document and index it for search.
+        
+        Intended to run as a background task after process_uploaded_file,
+        so it opens its own database session.
+        
+        Args:
+            document_id: ID of the uploaded document
+            
+        Returns:
+            bool: True if the document was indexed, False otherwise
+        """
+        from app.config.database import SessionLocal
+        
+        db = SessionLocal()
+        try:
+            document = db.query(Document).filter(Document.id == document_id).first()
+            if not document:
+                logger.warning(f"Document {document_id} not found for indexing")
+                return False
+            
+            if document.opensearch_indexed:
+                return True
+            
+            # Duplicate uploads arrive with the text already extracted
+            content_text = document.content_text
+            if content_text is None:
+                content_text = self._extract_text_content(Path(document.file_path), document.file_extension)
+                document.content_text = content_text
+                db.commit()
+            
             # Index document for search if content is available
             if content_text and document.is_searchable:
                 try:
-                    rag_service.index_document(document, content_text)
-                    document.opensearch_indexed = True
+                    document.opensearch_indexed = rag_service.index_document(document, content_text)
                     db.commit()
                 except Exception as e:
                     logger.warning(f"Failed to index document {document.id}: {e}")
             
-            logger.info(f"Document uploaded successfully: {document.id}")
-            return True, document, []
+            return bool(document.opensearch_indexed)
             
         except Exception as e:
-            logger.error(f"Error processing uploaded file: {e}")
-            return False, None, [f"Error processing file: {str(e)}"]
+            db.rollback()
+            logger.error(f"Error indexing document {document_id}: {e}")
+            return False
+        finally:
+            db.close()
+    
+    @staticmethod
+    def _hash_upload(file: BinaryIO) -> str:
+        """Compute the BLAKE2b content hash of an upload and rewind it"""
+        hash_obj = hashlib.blake2b(digest_size=16)
+        file.seek(0)
+        for chunk in iter(lambda: file.read(1024 * 1024), b""):
+            hash_obj.update(chunk)
+        file.seek(0)
+        return hash_obj.hexdigest()
+    
+    def _save_file(self, file: BinaryIO, file_path: Path) -> None:
+        """Persist uploaded file, using a kernel-space copy when it is backed by a real file"""
+        file.seek(0)
+        src_fd = self._get_fileno(file)
+        
+        # Both paths create the file the same way, so permissions do not
+        # depend on whether the upload was spooled to disk
+        with open(file_path, "wb") as f:
+            if src_fd is None or not hasattr(os, "sendfile"):
+                shutil.copyfileobj(file, f)
+                return
+            
+            src_size = os.fstat(src_fd).st_size
+            offset = 0
+            while offset < src_size:
+                sent = os.sendfile(f.fileno(), src_fd, offset, src_size - offset)
+                if sent == 0:
+                    raise OSError(f"Upload truncated while saving {file_path.name}: "
+                                  f"copied {offset} of {src_size} bytes")
+                offset += sent
+    
+    @staticmethod
+    def _get_fileno(file: BinaryIO) -> Optional[int]:
+        """Return the OS file descriptor behind an upload, or None if it lives in memory"""
+        # Calling fileno() on an in-memory SpooledTemporaryFile would force it
+        # to disk; it only has a name once it has rolled over to a real file
+        if isinstance(file, tempfile.SpooledTemporaryFile) and file.name is None:
+            return None
+        try:
+            return file.fileno()
+        except (AttributeError, OSError, io.UnsupportedOperation):
+            return None
+    
+    @staticmethod
+    def _get_file_size(file: BinaryIO) -> int:
+        """Determine upload size when the caller does not know it"""
+        file.seek(0, 2)  # Seek to end
+        file_size = file.tell()
+        file.seek(0)  # Reset to beginning
+        return file_size
     
-    def _validate_file(self, file: BinaryIO, filename: str) -> Tuple[bool, List[str]]:
+    def _validate_file(self, filename: str, file_size: int) -> Tuple[bool, List[str]]:
         """Validate uploaded file"""
         errors = []
         
         # Check file extension
         file_extension = Path(filename).suffix.lower()
         if file_extension not in self.allowed_extensions:
-            errors.append(f"File type {file_extension} not allowed. Allowed types: {', '.join(self.allowed_extensions)}")
+            errors.append(f"File type {file_extension} not allowed. Allowed types: {', '.join(sorted(self.allowed_extensions))}")
         
         # Check file size
-        file.seek(0, 2)  # Seek to end
-        file_size = file.tell()
-        file.seek(0)  # Reset to beginning
-        
         if file_size > self.max_file_size:
             errors.append(f"File size ({file_size} bytes) exceeds maximum allowed size ({self.max_file_size} bytes)")
         
@@ -131,49 +349,51 @@ class DocumentService:
     
     def _extract_text_content(self, file_path: Path, file_extension: str) -> str:
         """Extract text content from file for indexing"""
+        extractor = self._extractors.get(file_extension)
+        if extractor is None:
+            return ""
         try:
-            if file_extension == ".txt":
-                with open(file_path, "r", encoding="utf-8") as f:
-                    return f.read()
-            elif file_extension == ".pdf":
-                return self._extract_pdf_text(file_path)
-            elif file_extension == ".docx":
-                return self._extract_docx_text(file_path)
-            else:
-                return ""
+            return extractor(file_path)
         except Exception as e:
             logger.warning(f"Failed to extract text from {file_path}: {e}")
             return ""
     
+    def _extract_txt_text(self, file_path: Path) -> str:
+        """Extract text from plain text file"""
+        with open(file_path, "r", encoding="utf-8") as f:
+            return f.read()
+    
     def _extract_pdf_text(self, file_path: Path) -> str:
         """Extract text from PDF file"""
         try:
-            import PyPDF2
-            with open(file_path, "rb") as f:
-                reader = PyPDF2.PdfReader(f)
-                text = ""
-                for page in reader.pages:
-                    text += page.extract_text()
-                return text
+            if file_path.stat().st_size <= PDF_OFFLOAD_SIZE:
+                text = _extract_small_pdf_text(file_path)
+                if text is not None:
+                    return text
+            
+            future = self._get_process_pool().submit(_extract_pdf_text_sync, str(file_path))
+            return future.result()
         except ImportError:
-            logger.warning("PyPDF2 not available for PDF text extraction")
+            logger.warning("Neither pymupdf nor PyPDF2 available for PDF text extraction")
             return ""
         except Exception as e:
             logger.warning(f"Error extracting PDF text: {e}")
             return ""
     
     def _extract_docx_text(self, file_path: Path) -> str:
-        """Extract text from DOCX file"""
+        """Extract text from DOCX file by streaming word/document.xml"""
         try:
-            from docx import Document as DocxDocument
-            doc = DocxDocument(file_path)
-            text = ""
-            for paragraph in doc.paragraphs:
-                text += paragraph.text + "\n"
-            return text
-        except ImportError:
-            logger.warning("python-docx not available for DOCX text extraction")
-            return ""
+            parts = []
+            with zipfile.ZipFile(file_path) as archive, archive.open("word/document.xml") as xml_file:
+                for _, element in ET.iterparse(xml_file, events=("end",)):
+                    if element.tag == _WORD_TEXT:
+                        parts.append(element.text or "")
+                    elif element.tag == _WORD_TAB:
+                        parts.append("\t")
+                    elif element.tag == _WORD_PARAGRAPH:
+                        parts.append("\n")
+                        element.clear()
+            return "".join(parts)
         except Exception as e:
             logger.warning(f"Error extracting DOCX text: {e}")
             return ""
@@ -192,7 +412,7 @@ class DocumentService:
             Tuple[bool, Optional[DocumentRequest], List[str]]: (success, request, errors)
         """
         try:
-            request_id = f"DR{datetime.now().strftime('%Y%m%d')}{secrets.token_hex(3).upper()}"
+            request_id = self._generate_request_id(db)
             
             # Estimate completion time based on document type and urgency
             estimated_completion = self._estimate_completion_time(
@@ -230,6 +450,11 @@ class DocumentService:
             logger.error(f"Error creating document request: {e}")
             return False, None, [f"Error creating request: {str(e)}"]
     
+    def _generate_request_id(self, db: Session) -> str:
+        """Generate a unique request ID (DR + date + zero-padded sequence value)"""
+        sequence_value = db.execute(select(document_request_seq.next_value())).scalar()
+        return f"DR{datetime.now().strftime('%Y%m%d')}{sequence_value:08d}"
+    
     def _estimate_completion_time(self, document_type: str, urgency: str) -> datetime:
         """Estimate completion time for document request"""
         base_hours = {
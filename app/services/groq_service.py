@@ -5,20 +5,255 @@ This service handles AI chat functionality, natural language processing,
 and intelligent response generation using Groq's language models.
 """
 
+import os
+import re
+import bisect
+import asyncio
 import time
 import json
-from typing import List, Dict, Any, Optional, Tuple
-from datetime import datetime
-from groq import Groq
+import hashlib
+import functools
+import threading
+from types import MappingProxyType
+from collections import OrderedDict, deque
+from typing import List, Dict, Any, Optional, Tuple, Set, FrozenSet, Iterator, Deque, Sequence, Union, Mapping, TYPE_CHECKING
 
-from app.config.groq_config import get_groq_client, groq_config, get_hr_system_prompt
-from app.services.rag_service import rag_service
+try:
+    import numba
+except ImportError:
+    numba = None
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+from app.config.groq_config import (
+    get_groq_client, get_async_groq_client, groq_config, get_hr_system_prompt
+)
 from app.models.employee import Employee
 from app.schemas.chat import QueryCategoryEnum, SentimentEnum
 from app.utils.logger import get_logger
 
+if TYPE_CHECKING:
+    from groq import Groq, AsyncGroq
+
 logger = get_logger(__name__)
 
+def _keyword_forms(keyword: str) -> Set[str]:
+    """Return a keyword together with its common inflections (plural, past tense, -ing)"""
+    stem = keyword[:-1] if keyword.endswith("e") else keyword
+    forms = {keyword, keyword + "s", keyword + "es", stem + "ed", stem + "ing"}
+    if keyword.endswith("y"):
+        forms.add(keyword[:-1] + "ies")
+    return forms
+
+_WORD_RE = re.compile(r"[a-z0-9']+")
+
+def _utc_isoformat(epoch: float) -> str:
+    """Format an epoch timestamp like datetime.utcnow().isoformat() without building a datetime"""
+    seconds = int(epoch)
+    return f"{time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(seconds))}.{int((epoch - seconds) * 1e6):06d}"
+
+# Number of previous conversation messages sent to the model as context
+HISTORY_LENGTH = 6
+
+ConversationHistory = Union[Deque[Dict[str, str]], Sequence[Dict[str, str]]]
+
+def _recent_history(conversation_history: Optional[ConversationHistory]) -> Sequence[Dict[str, str]]:
+    """Return the messages sent as context; bounded deques are used without copying"""
+    if not conversation_history:
+        return ()
+    if isinstance(conversation_history, deque) and conversation_history.maxlen == HISTORY_LENGTH:
+        return conversation_history
+    return list(conversation_history)[-HISTORY_LENGTH:]
+
+# Keyword tables for intent classification, sentiment and escalation.
+# Scores are set intersections against the keywords found by GroqService._scan.
+INTENT_KEYWORDS: Dict[str, FrozenSet[str]] = {
+    "leave_request": frozenset({
+        "leave", "vacation", "sick", "time off", "holiday", "absent", "pto"
+    }),
+    "document_request": frozenset({
+        "document", "certificate", "letter", "form", "paper", "download"
+    }),
+    "policy_question": frozenset({
+        "policy", "rule", "guideline", "procedure", "regulation", "handbook"
+    }),
+    "benefits_inquiry": frozenset({
+        "benefit", "insurance", "health", "dental", "retirement", "401k", "medical"
+    }),
+    "payroll_query": frozenset({
+        "salary", "pay", "payroll", "bonus", "overtime", "deduction", "tax"
+    }),
+    "training_request": frozenset({
+        "training", "course", "workshop", "certification", "skill", "development"
+    })
+}
+
+# Intent categories aligned by index with their keyword sets
+_INTENT_ORDER: Tuple[QueryCategoryEnum, ...] = (
+    QueryCategoryEnum.LEAVE_MANAGEMENT,
+    QueryCategoryEnum.DOCUMENT_REQUEST,
+    QueryCategoryEnum.POLICY_QUESTION,
+    QueryCategoryEnum.BENEFITS_INQUIRY,
+    QueryCategoryEnum.PAYROLL_QUERY,
+    QueryCategoryEnum.TRAINING_REQUEST
+)
+_INTENT_KEYWORD_SETS: Tuple[FrozenSet[str], ...] = tuple(INTENT_KEYWORDS.values())
+_INTENT_KEYWORD_COUNTS: Tuple[int, ...] = tuple(len(keywords) for keywords in _INTENT_KEYWORD_SETS)
+_INTENT_INDEXES = range(len(_INTENT_ORDER))
+
+POSITIVE_WORDS: FrozenSet[str] = frozenset({
+    "good", "great", "excellent", "happy", "satisfied", "pleased", "helpful",
+    "thanks", "thank you", "appreciate", "wonderful", "amazing", "perfect"
+})
+
+NEGATIVE_WORDS: FrozenSet[str] = frozenset({
+    "bad", "terrible", "awful", "angry", "frustrated", "disappointed", "unhappy",
+    "hate", "horrible", "worst", "useless", "annoying", "difficult", "problem"
+})
+
+_SENTIMENT_TABLE: Tuple[SentimentEnum, ...] = (
+    SentimentEnum.NEGATIVE, SentimentEnum.MIXED, SentimentEnum.POSITIVE
+)
+
+# Ordered by priority: the first trigger found is reported as the escalation reason
+ESCALATION_TRIGGERS: Tuple[str, ...] = (
+    "complaint", "harassment", "discrimination", "legal", "lawsuit",
+    "terminate", "fire", "quit", "resign", "disciplinary", "grievance",
+    "urgent", "emergency", "serious", "violation", "report"
+)
+_ESCALATION_SET: FrozenSet[str] = frozenset(ESCALATION_TRIGGERS)
+
+# Phrases that signal the model is unsure of its answer
+UNCERTAINTY_PHRASES: Tuple[str, ...] = (
+    "i'm not sure", "i don't know", "might be", "possibly", "maybe",
+    "you should contact", "please check with", "i recommend contacting"
+)
+_UNCERTAINTY_RE = re.compile("|".join(map(re.escape, UNCERTAINTY_PHRASES)))
+
+# Suggested follow-up actions per intent
+_INTENT_ACTIONS: Mapping[QueryCategoryEnum, Tuple[str, ...]] = MappingProxyType({
+    QueryCategoryEnum.LEAVE_MANAGEMENT: (
+        "Submit a leave request",
+        "Check leave balance",
+        "View leave policy"
+    ),
+    QueryCategoryEnum.DOCUMENT_REQUEST: (
+        "Request employment certificate",
+        "Download pay slip",
+        "Access employee handbook"
+    ),
+    QueryCategoryEnum.POLICY_QUESTION: (
+        "Read full policy document",
+        "Contact HR for clarification",
+        "Schedule policy training"
+    ),
+    QueryCategoryEnum.BENEFITS_INQUIRY: (
+        "Review benefits package",
+        "Contact benefits administrator",
+        "Schedule benefits consultation"
+    ),
+    QueryCategoryEnum.PAYROLL_QUERY: (
+        "Check pay slip",
+        "Contact payroll department",
+        "Update tax information"
+    ),
+    QueryCategoryEnum.TRAINING_REQUEST: (
+        "Browse training catalog",
+        "Request training enrollment",
+        "Schedule skills assessment"
+    )
+})
+_DEFAULT_ACTIONS: Tuple[str, ...] = (
+    "Contact HR for more information",
+    "Browse employee resources",
+    "Schedule HR consultation"
+)
+
+# Static parts of the RAG-augmented user message, joined around context and query
+_RAG_PREFIX = "Based on the following information from our HR documents:\n\n"
+_RAG_MID = "\n\nPlease answer this question: "
+_RAG_SUFFIX = (
+    "\n\nIf the information provided doesn't fully answer the question, please say so "
+    "and provide general guidance while recommending the user contact HR for specific details."
+)
+
+_ALL_KEYWORDS: FrozenSet[str] = frozenset().union(
+    *INTENT_KEYWORDS.values(), POSITIVE_WORDS, NEGATIVE_WORDS, ESCALATION_TRIGGERS
+)
+
+def _jit(func):
+    """Compile a pure numeric kernel with numba when it is installed"""
+    if numba is None:
+        return func
+    return numba.njit(cache=True, fastmath=True)(func)
+
+@_jit
+def _confidence_math(rag_score: float, intent_confidence: float,
+                     uncertainty_hits: int, long_enough: bool) -> float:
+    """Numeric part of GroqService._calculate_confidence"""
+    base_confidence = 0.5
+    
+    # Adjust based on response length and completeness
+    if long_enough:
+        base_confidence += 0.2
+    
+    # Adjust based on RAG score
+    if rag_score > 0.7:
+        base_confidence += 0.2
+    elif rag_score > 0.5:
+        base_confidence += 0.1
+    
+    # Adjust based on intent confidence
+    base_confidence += intent_confidence * 0.1
+    
+    # Penalize uncertainty indicators
+    base_confidence -= 0.1 * uncertainty_hits
+    
+    return max(0.0, min(1.0, base_confidence))
+
+COMPLEXITY_LEVELS: Tuple[str, ...] = ("simple", "medium", "complex")
+
+@_jit
+def _complexity_index(query_length: int, response_length: int) -> int:
+    """Numeric part of GroqService._assess_complexity (index into COMPLEXITY_LEVELS)"""
+    if query_length <= 5 and response_length <= 50:
+        return 0
+    elif query_length <= 15 and response_length <= 150:
+        return 1
+    else:
+        return 2
+
+class _PrefixTrie:
+    """Character trie mapping word prefixes to the ids of entries containing such a word"""
+    
+    __slots__ = ("children", "ids")
+    
+    def __init__(self):
+        self.children: Dict[str, "_PrefixTrie"] = {}
+        self.ids: Set[int] = set()
+    
+    def insert(self, word: str, entry_id: int) -> None:
+        """Register every prefix of word for entry_id"""
+        node = self
+        for char in word:
+            child = node.children.get(char)
+            if child is None:
+                child = node.children[char] = _PrefixTrie()
+            child.ids.add(entry_id)
+            node = child
+    
+    def lookup(self, prefix: str) -> Set[int]:
+        """Return ids of entries containing a word starting with prefix"""
+        node = self
+        for char in prefix:
+            node = node.children.get(char)
+            if node is None:
+                return set()
+        return node.ids
+
 class GroqService:
     """
     Groq AI service for intelligent HR assistance
@@ -26,126 +261,271 @@ class GroqService:
     
     def __init__(self):
         self.client = None
+        self.aclient = None
         self.model = groq_config.model
         self.max_tokens = groq_config.max_tokens
         self.temperature = groq_config.temperature
         
-        # Response configuration
+        # Response configuration (max_context_length is in tokens)
         self.max_context_length = 2000
+        self._encoding = None
+        self._encoding_loaded = False
+        self._system_prompt_tokens: Dict[QueryCategoryEnum, int] = {}
         self.confidence_threshold = 0.6
         self.escalation_threshold = 0.3
         
-        # Intent patterns for query classification
-        self.intent_patterns = {
-            "leave_request": [
-                "leave", "vacation", "sick", "time off", "holiday", "absent", "pto"
-            ],
-            "document_request": [
-                "document", "certificate", "letter", "form", "paper", "download"
-            ],
-            "policy_question": [
-                "policy", "rule", "guideline", "procedure", "regulation", "handbook"
-            ],
-            "benefits_inquiry": [
-                "benefit", "insurance", "health", "dental", "retirement", "401k", "medical"
-            ],
-            "payroll_query": [
-                "salary", "pay", "payroll", "bonus", "overtime", "deduction", "tax"
-            ],
-            "training_request": [
-                "training", "course", "workshop", "certification", "skill", "development"
-            ]
+        # LRU cache of complete responses for repeated questions. Entries also
+        # expire: the RAG index version in the key is per process, so another
+        # worker's document uploads are only picked up once the TTL passes
+        self.response_cache_size = int(os.getenv("RESPONSE_CACHE_SIZE", "128"))
+        self.response_cache_ttl = float(os.getenv("RESPONSE_CACHE_TTL", "300"))
+        self._response_cache: "OrderedDict[bytes, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._response_cache_lock = threading.Lock()
+        
+        # Keyword tables shared by every instance (see module constants)
+        self.intent_patterns = INTENT_KEYWORDS
+        self.positive_words = POSITIVE_WORDS
+        self.negative_words = NEGATIVE_WORDS
+        self.escalation_triggers = ESCALATION_TRIGGERS
+        
+        self._keyword_re, self._keyword_lookup = self._build_keyword_matcher()
+        self._scan_cached = functools.lru_cache(maxsize=2048)(self._scan_text)
+        
+        # System prompt message per intent, built once and shared by every request
+        self._system_messages: Dict[QueryCategoryEnum, Dict[str, str]] = {
+            intent: {"role": "system", "content": get_hr_system_prompt(intent.value)}
+            for intent in QueryCategoryEnum
         }
+        
+        # Common HR queries for autocomplete, indexed by word prefix
+        self.common_queries = [
+            "How do I request sick leave?",
+            "What is the company vacation policy?",
+            "How do I update my personal information?",
+            "Where can I find my pay slip?",
+            "How do I enroll in health insurance?",
+            "What training programs are available?",
+            "How do I report a workplace issue?",
+            "What are my benefits?",
+            "How do I request a employment certificate?",
+            "What is the dress code policy?"
+        ]
+        self._suggestion_trie = _PrefixTrie()
+        for query_id, query in enumerate(self.common_queries):
+            for word in _WORD_RE.findall(query.lower()):
+                self._suggestion_trie.insert(word, query_id)
+    
+    def _build_keyword_matcher(self) -> Tuple["re.Pattern[str]", Dict[str, Tuple[str, ...]]]:
+        """
+        Compile one word-boundary alternation over every known keyword
+        
+        Returns:
+            Tuple: (compiled pattern, matched form -> keywords it stands for)
+        """
+        lookup: Dict[str, Set[str]] = {}
+        for keyword in _ALL_KEYWORDS:
+            for form in _keyword_forms(keyword):
+                lookup.setdefault(form, set()).add(keyword)
+        
+        # Longest forms first so the alternation prefers the most specific match
+        alternation = "|".join(re.escape(form) for form in sorted(lookup, key=len, reverse=True))
+        return (
+            re.compile(rf"\b(?:{alternation})\b"),
+            {form: tuple(keywords) for form, keywords in lookup.items()}
+        )
     
-    def _get_client(self) -> Groq:
+    def _scan(self, text: str, text_lower: Optional[str] = None) -> FrozenSet[str]:
+        """
+        Find all keywords present in text in a single pass
+        
+        Keywords only match whole words (or their inflections), so e.g.
+        "pay" does not match inside "repayment". Results are LRU-cached per
+        lowercased text and must not be mutated.
+        
+        Args:
+            text: Text to scan
+            text_lower: text.lower(), if the caller already has it
+            
+        Returns:
+            FrozenSet[str]: Keywords present in text (in their base form)
+        """
+        return self._scan_cached(text.lower() if text_lower is None else text_lower)
+    
+    def _scan_text(self, text_lower: str) -> FrozenSet[str]:
+        """Uncached implementation of _scan for already lowercased text"""
+        lookup = self._keyword_lookup
+        return frozenset(
+            keyword
+            for form in self._keyword_re.findall(text_lower)
+            for keyword in lookup[form]
+        )
+    
+    def _scan_batch(self, texts_lower: List[str]) -> List[FrozenSet[str]]:
+        """
+        Scan many lowercased texts with one regex pass over a joined buffer
+        
+        Texts are joined with newlines, which no keyword contains and which
+        are word boundaries, so matches never span two texts.
+        
+        Args:
+            texts_lower: Lowercased texts
+            
+        Returns:
+            List[FrozenSet[str]]: _scan result for each text, in order
+        """
+        starts = []
+        offset = 0
+        for text in texts_lower:
+            starts.append(offset)
+            offset += len(text) + 1
+        
+        found: List[Set[str]] = [set() for _ in texts_lower]
+        lookup = self._keyword_lookup
+        for match in self._keyword_re.finditer("\n".join(texts_lower)):
+            found[bisect.bisect_right(starts, match.start()) - 1].update(lookup[match.group()])
+        return [frozenset(keywords) for keywords in found]
+    
+    def _response_cache_key(self, query: str, user: Optional[Employee],
+                            conversation_history: Optional[ConversationHistory],
+                            use_rag: bool) -> bytes:
+        """Build the response cache key from everything the response depends on"""
+        if use_rag:
+            from app.services.rag_service import rag_service
+        key_data = json.dumps(
+            [
+                query,
+                user.id if user else 0,
+                list(_recent_history(conversation_history)),
+                rag_service.index_version if use_rag else None
+            ],
+            sort_keys=True
+        )
+        return hashlib.blake2b(key_data.encode(), digest_size=16).digest()
+    
+    def _get_cached_response(self, key: bytes) -> Optional[Dict[str, Any]]:
+        """Return a cached response and mark it as recently used"""
+        with self._response_cache_lock:
+            cached = self._response_cache.get(key)
+            if cached is None:
+                return None
+            if cached[0] <= time.monotonic():
+                del self._response_cache[key]
+                return None
+            self._response_cache.move_to_end(key)
+            return cached[1]
+    
+    def _store_cached_response(self, key: bytes, response_data: Dict[str, Any]):
+        """Store a response, evicting the least recently used entry when full"""
+        with self._response_cache_lock:
+            self._response_cache[key] = (time.monotonic() + self.response_cache_ttl, response_data)
+            self._response_cache.move_to_end(key)
+            while len(self._response_cache) > self.response_cache_size:
+                self._response_cache.popitem(last=False)
+    
+    def clear_response_cache(self):
+        """Drop all cached responses (e.g. after HR policy content changes)"""
+        with self._response_cache_lock:
+            self._response_cache.clear()
+    
+    @staticmethod
+    def new_history() -> Deque[Dict[str, str]]:
+        """Return an empty conversation history bounded to HISTORY_LENGTH messages"""
+        return deque(maxlen=HISTORY_LENGTH)
+    
+    def _get_client(self) -> "Groq":
         """Get Groq client instance"""
         if self.client is None:
             self.client = get_groq_client()
         return self.client
     
-    def classify_query_intent(self, query: str) -> Tuple[QueryCategoryEnum, float]:
+    def _get_async_client(self) -> "AsyncGroq":
+        """Get async Groq client instance"""
+        if self.aclient is None:
+            self.aclient = get_async_groq_client()
+        return self.aclient
+    
+    def classify_query_intent(self, query: str,
+                              matches: Optional[FrozenSet[str]] = None,
+                              query_lower: Optional[str] = None) -> Tuple[QueryCategoryEnum, float]:
         """
         Classify user query intent using keyword matching and patterns
         
         Args:
             query: User query text
+            matches: Result of _scan(query), if already computed
+            query_lower: query.lower(), if already computed
             
         Returns:
             Tuple[QueryCategoryEnum, float]: (intent, confidence_score)
         """
-        query_lower = query.lower()
-        intent_scores = {}
+        if matches is None:
+            matches = self._scan(query, query_lower)
         
-        # Calculate scores for each intent
-        for intent, keywords in self.intent_patterns.items():
-            score = 0
-            for keyword in keywords:
-                if keyword in query_lower:
-                    score += 1
-            
-            if score > 0:
-                intent_scores[intent] = score / len(keywords)
+        # Calculate scores for each intent, aligned with _INTENT_ORDER
+        scores = [
+            len(keywords & matches) / count
+            for keywords, count in zip(_INTENT_KEYWORD_SETS, _INTENT_KEYWORD_COUNTS)
+        ]
         
-        # Find best matching intent
-        if not intent_scores:
+        # Find best matching intent (first one wins ties)
+        best = max(_INTENT_INDEXES, key=scores.__getitem__)
+        if scores[best] == 0:
             return QueryCategoryEnum.GENERAL_HR, 0.5
         
-        best_intent = max(intent_scores, key=intent_scores.get)
-        confidence = intent_scores[best_intent]
-        
-        # Map to enum
-        intent_mapping = {
-            "leave_request": QueryCategoryEnum.LEAVE_MANAGEMENT,
-            "document_request": QueryCategoryEnum.DOCUMENT_REQUEST,
-            "policy_question": QueryCategoryEnum.POLICY_QUESTION,
-            "benefits_inquiry": QueryCategoryEnum.BENEFITS_INQUIRY,
-            "payroll_query": QueryCategoryEnum.PAYROLL_QUERY,
-            "training_request": QueryCategoryEnum.TRAINING_REQUEST
-        }
-        
-        return intent_mapping.get(best_intent, QueryCategoryEnum.GENERAL_HR), confidence
+        return _INTENT_ORDER[best], scores[best]
     
-    def analyze_sentiment(self, text: str) -> Tuple[SentimentEnum, float]:
+    def analyze_sentiment(self, text: str,
+                          matches: Optional[FrozenSet[str]] = None,
+                          text_lower: Optional[str] = None) -> Tuple[SentimentEnum, float]:
         """
         Analyze sentiment of user text using simple keyword-based approach
         
         Args:
             text: Text to analyze
+            matches: Result of _scan(text), if already computed
+            text_lower: text.lower(), if already computed
             
         Returns:
             Tuple[SentimentEnum, float]: (sentiment, confidence_score)
         """
-        text_lower = text.lower()
+        if matches is None:
+            matches = self._scan(text, text_lower)
         
         # Simple keyword-based sentiment analysis
-        positive_words = [
-            "good", "great", "excellent", "happy", "satisfied", "pleased", "helpful",
-            "thanks", "thank you", "appreciate", "wonderful", "amazing", "perfect"
-        ]
-        
-        negative_words = [
-            "bad", "terrible", "awful", "angry", "frustrated", "disappointed", "unhappy",
-            "hate", "horrible", "worst", "useless", "annoying", "difficult", "problem"
-        ]
-        
-        positive_score = sum(1 for word in positive_words if word in text_lower)
-        negative_score = sum(1 for word in negative_words if word in text_lower)
+        positive_score = len(POSITIVE_WORDS & matches)
+        negative_score = len(NEGATIVE_WORDS & matches)
         
         total_score = positive_score + negative_score
         
         if total_score == 0:
             return SentimentEnum.NEUTRAL, 0.5
         
-        if positive_score > negative_score:
-            confidence = positive_score / total_score
-            return SentimentEnum.POSITIVE, confidence
-        elif negative_score > positive_score:
-            confidence = negative_score / total_score
-            return SentimentEnum.NEGATIVE, confidence
-        else:
-            return SentimentEnum.MIXED, 0.5
+        # Sign of the difference indexes _SENTIMENT_TABLE: -1 negative, 0 mixed, 1 positive
+        diff = positive_score - negative_score
+        confidence = max(positive_score, negative_score) / total_score if diff else 0.5
+        return _SENTIMENT_TABLE[(diff > 0) - (diff < 0) + 1], confidence
     
-    def should_escalate(self, query: str, confidence: float, sentiment: SentimentEnum) -> Tuple[bool, str]:
+    def classify_query_intent_batch(self, queries: List[str]) -> List[Tuple[QueryCategoryEnum, float, SentimentEnum, float]]:
+        """
+        Classify intent and sentiment for many queries at once
+        
+        Args:
+            queries: User query texts
+            
+        Returns:
+            List[Tuple]: (intent, intent_confidence, sentiment, sentiment_score) per query
+        """
+        queries_lower = [query.lower() for query in queries]
+        results = []
+        for query, query_lower, matches in zip(queries, queries_lower, self._scan_batch(queries_lower)):
+            intent, intent_confidence = self.classify_query_intent(query, matches, query_lower)
+            sentiment, sentiment_score = self.analyze_sentiment(query, matches, query_lower)
+            results.append((intent, intent_confidence, sentiment, sentiment_score))
+        return results
+    
+    def should_escalate(self, query: str, confidence: float, sentiment: SentimentEnum,
+                        matches: Optional[FrozenSet[str]] = None,
+                        query_lower: Optional[str] = None) -> Tuple[bool, str]:
         """
         Determine if query should be escalated to human HR
         
@@ -153,22 +533,19 @@ class GroqService:
             query: User query
             confidence: AI confidence in response
             sentiment: User sentiment
+            matches: Result of _scan(query), if already computed
+            query_lower: query.lower(), if already computed
             
         Returns:
             Tuple[bool, str]: (should_escalate, reason)
         """
-        escalation_triggers = [
-            "complaint", "harassment", "discrimination", "legal", "lawsuit",
-            "terminate", "fire", "quit", "resign", "disciplinary", "grievance",
-            "urgent", "emergency", "serious", "violation", "report"
-        ]
-        
-        query_lower = query.lower()
+        if matches is None:
+            matches = self._scan(query, query_lower)
         
         # Check for escalation trigger words
-        for trigger in escalation_triggers:
-            if trigger in query_lower:
-                return True, f"Contains escalation trigger: {trigger}"
+        if not _ESCALATION_SET.isdisjoint(matches):
+            trigger = next(t for t in ESCALATION_TRIGGERS if t in matches)
+            return True, f"Contains escalation trigger: {trigger}"
         
         # Check confidence threshold
         if confidence < self.escalation_threshold:
@@ -180,143 +557,414 @@ class GroqService:
         
         return False, ""
     
+    def _cached_response(self, cache_key: bytes, start_time: float) -> Optional[Dict[str, Any]]:
+        """Return a cached response with fresh timing fields, or None on a miss"""
+        cached = self._get_cached_response(cache_key)
+        if cached is None:
+            return None
+        now = time.time()
+        return {
+            **cached,
+            "processing_time_ms": int((now - start_time) * 1000),
+            "metadata": {**cached["metadata"], "timestamp": _utc_isoformat(now)}
+        }
+    
+    def _build_messages(self, query: str, intent: QueryCategoryEnum,
+                        context_data: Dict[str, Any],
+                        conversation_history: Optional[ConversationHistory]) -> List[Dict[str, str]]:
+        """
+        Build the chat completion messages for a query
+        
+        Args:
+            query: User query
+            intent: Classified query intent
+            context_data: RAG context (empty dict when RAG is disabled)
+            conversation_history: Previous conversation messages
+            
+        Returns:
+            List[Dict[str, str]]: Messages for the completion API
+        """
+        # Build messages for API call, starting with the intent's system prompt
+        messages = [self._system_messages[intent]]
+        
+        # Add conversation history
+        messages.extend(_recent_history(conversation_history))
+        
+        # Add context from RAG if available
+        user_message = query
+        if context_data.get("has_context"):
+            context_text = self._clamp_context(context_data["context_text"], intent, query)
+            user_message = "".join((_RAG_PREFIX, context_text, _RAG_MID, query, _RAG_SUFFIX))
+        
+        messages.append({"role": "user", "content": user_message})
+        return messages
+    
+    def _get_encoding(self):
+        """Load the tokenizer on first use; None when tiktoken is unavailable"""
+        if not self._encoding_loaded:
+            if tiktoken is not None:
+                try:
+                    encoding = tiktoken.get_encoding("cl100k_base")
+                    self._system_prompt_tokens = {
+                        intent: len(encoding.encode(message["content"]))
+                        for intent, message in self._system_messages.items()
+                    }
+                    self._encoding = encoding
+                except Exception as e:
+                    logger.warning(f"Tokenizer unavailable, RAG context will not be clamped: {e}")
+            self._encoding_loaded = True
+        return self._encoding
+    
+    def _clamp_context(self, context_text: str, intent: QueryCategoryEnum, query: str) -> str:
+        """
+        Trim RAG context to the token budget left by the system prompt and query
+        
+        Args:
+            context_text: Retrieved context
+            intent: Query intent (selects the system prompt)
+            query: User query
+            
+        Returns:
+            str: Context cut at a token boundary, or unchanged if it fits
+        """
+        encoding = self._get_encoding()
+        if encoding is None:
+            return context_text
+        
+        budget = self.max_context_length - self._system_prompt_tokens[intent] - len(encoding.encode(query))
+        tokens = encoding.encode(context_text)
+        if len(tokens) <= budget:
+            return context_text
+        return encoding.decode(tokens[:max(budget, 0)])
+    
+    def _completion_kwargs(self, messages: List[Dict[str, str]]) -> Dict[str, Any]:
+        """Keyword arguments shared by every chat completion request"""
+        return {
+            "model": self.model,
+            "messages": messages,
+            "max_tokens": self.max_tokens,
+            "temperature": self.temperature,
+            "top_p": 1,
+            "frequency_penalty": 0,
+            "presence_penalty": 0
+        }
+    
+    def _build_response_data(self, query: str, query_lower: str, matches: FrozenSet[str],
+                             user: Optional[Employee], ai_message: str, tokens_used: int,
+                             intent: QueryCategoryEnum, intent_confidence: float,
+                             sentiment: SentimentEnum, sentiment_score: float,
+                             context_data: Dict[str, Any], start_time: float) -> Dict[str, Any]:
+        """
+        Post-process a completion into the response payload
+        
+        Args:
+            query: User query
+            query_lower: query.lower()
+            matches: Result of _scan(query)
+            user: Current user
+            ai_message: Completion text
+            tokens_used: Tokens reported by the API
+            intent: Classified query intent
+            intent_confidence: Intent classification confidence
+            sentiment: User sentiment
+            sentiment_score: Sentiment confidence
+            context_data: RAG context used for the completion
+            start_time: time.time() at the start of the request
+            
+        Returns:
+            Dict: Response data including message, metadata, and analytics
+        """
+        # Calculate processing time; the same clock read stamps the metadata
+        now = time.time()
+        processing_time = now - start_time
+        
+        # Calculate confidence score (simplified)
+        response_lower = ai_message.lower()
+        confidence_score = self._calculate_confidence(
+            ai_message, context_data.get("relevance_score", 0), intent_confidence,
+            response_lower
+        )
+        
+        # Check if escalation is needed
+        should_escalate, escalation_reason = self.should_escalate(
+            query, confidence_score, sentiment, matches, query_lower
+        )
+        
+        # Generate suggested actions
+        suggested_actions = self._generate_suggested_actions(intent, ai_message)
+        
+        return {
+            "message": ai_message,
+            "intent": intent,
+            "intent_confidence": intent_confidence,
+            "sentiment": sentiment,
+            "sentiment_score": sentiment_score,
+            "confidence_score": confidence_score,
+            "processing_time_ms": int(processing_time * 1000),
+            "tokens_used": tokens_used,
+            "model_used": self.model,
+            "context_used": context_data.get("has_context", False),
+            "context_sources": context_data.get("sources", []),
+            "rag_score": context_data.get("relevance_score", 0),
+            "requires_escalation": should_escalate,
+            "escalation_reason": escalation_reason,
+            "suggested_actions": suggested_actions,
+            "complexity_level": self._assess_complexity(query, ai_message),
+            "metadata": {
+                "user_id": user.id if user else None,
+                "timestamp": _utc_isoformat(now),
+                "session_data": {
+                    "intent_history": [intent.value],
+                    "response_quality": confidence_score
+                }
+            }
+        }
+    
+    def _error_response(self, error: Exception, start_time: float) -> Dict[str, Any]:
+        """Fallback response returned when the AI call fails"""
+        logger.error(f"Error generating AI response: {error}")
+        return {
+            "message": "I apologize, but I'm having trouble processing your request right now. Please try again later or contact HR directly for assistance.",
+            "intent": QueryCategoryEnum.GENERAL_HR,
+            "intent_confidence": 0.0,
+            "sentiment": SentimentEnum.NEUTRAL,
+            "sentiment_score": 0.5,
+            "confidence_score": 0.0,
+            "processing_time_ms": int((time.time() - start_time) * 1000),
+            "tokens_used": 0,
+            "model_used": self.model,
+            "context_used": False,
+            "context_sources": [],
+            "rag_score": 0,
+            "requires_escalation": True,
+            "escalation_reason": "AI service error",
+            "suggested_actions": ["Contact HR directly"],
+            "complexity_level": "error",
+            "error": str(error)
+        }
+    
     def generate_response(self, 
                          query: str, 
                          user: Optional[Employee] = None,
-                         conversation_history: List[Dict[str, str]] = None,
+                         conversation_history: Optional[ConversationHistory] = None,
                          use_rag: bool = True) -> Dict[str, Any]:
         """
         Generate AI response to user query
         
+        Blocking variant for synchronous callers; request handlers running on
+        the event loop should use agenerate_response instead.
+        
         Args:
             query: User query
             user: Current user (for personalization)
-            conversation_history: Previous conversation messages
+            conversation_history: Previous conversation messages, ideally a
+                deque from new_history(); only the last HISTORY_LENGTH are used
             use_rag: Whether to use RAG for context retrieval
             
         Returns:
             Dict: Response data including message, metadata, and analytics
         """
         start_time = time.time()
+        query_lower = query.lower()
+        
+        # Repeated questions with the same user, history and search index
+        # state are answered from the cache
+        cache_key = self._response_cache_key(query, user, conversation_history, use_rag)
+        cached = self._cached_response(cache_key, start_time)
+        if cached is not None:
+            return cached
         
         try:
-            # Classify intent and analyze sentiment
-            intent, intent_confidence = self.classify_query_intent(query)
-            sentiment, sentiment_score = self.analyze_sentiment(query)
+            # Classify intent and analyze sentiment from a single keyword scan
+            matches = self._scan(query, query_lower)
+            intent, intent_confidence = self.classify_query_intent(query, matches, query_lower)
+            sentiment, sentiment_score = self.analyze_sentiment(query, matches, query_lower)
             
             # Get relevant context if RAG is enabled
             context_data = {}
             if use_rag:
+                from app.services.rag_service import rag_service
                 context_data = rag_service.get_relevant_context(query)
             
-            # Build system prompt based on intent
-            system_prompt = get_hr_system_prompt(intent.value)
-            
-            # Build messages for API call
-            messages = [{"role": "system", "content": system_prompt}]
-            
-            # Add conversation history
-            if conversation_history:
-                messages.extend(conversation_history[-6:])  # Last 6 messages for context
-            
-            # Add context from RAG if available
-            user_message = query
-            if context_data.get("has_context"):
-                context_text = context_data["context_text"]
-                user_message = f"""Based on the following information from our HR documents:
-
-{context_text}
-
-Please answer this question: {query}
-
-If the information provided doesn't fully answer the question, please say so and provide general guidance while recommending the user contact HR for specific details."""
-            
-            messages.append({"role": "user", "content": user_message})
+            messages = self._build_messages(query, intent, context_data, conversation_history)
             
             # Get AI response
             client = self._get_client()
-            response = client.chat.completions.create(
-                model=self.model,
-                messages=messages,
-                max_tokens=self.max_tokens,
-                temperature=self.temperature,
-                top_p=1,
-                frequency_penalty=0,
-                presence_penalty=0
-            )
+            response = client.chat.completions.create(**self._completion_kwargs(messages))
             
             # Extract response
             ai_message = response.choices[0].message.content
             tokens_used = response.usage.total_tokens if response.usage else 0
             
-            # Calculate processing time
-            processing_time = time.time() - start_time
-            
-            # Calculate confidence score (simplified)
-            confidence_score = self._calculate_confidence(
-                ai_message, context_data.get("relevance_score", 0), intent_confidence
+            response_data = self._build_response_data(
+                query, query_lower, matches, user, ai_message, tokens_used,
+                intent, intent_confidence, sentiment, sentiment_score,
+                context_data, start_time
             )
             
-            # Check if escalation is needed
-            should_escalate, escalation_reason = self.should_escalate(
-                query, confidence_score, sentiment
+            self._store_cached_response(cache_key, response_data)
+            return response_data
+            
+        except Exception as e:
+            return self._error_response(e, start_time)
+    
+    async def agenerate_response(self,
+                                 query: str,
+                                 user: Optional[Employee] = None,
+                                 conversation_history: Optional[ConversationHistory] = None,
+                                 use_rag: bool = True) -> Dict[str, Any]:
+        """
+        Generate AI response to user query without blocking the event loop
+        
+        The RAG lookup runs in a worker thread while the query is classified,
+        and the completion is awaited on the async Groq client.
+        
+        Args:
+            query: User query
+            user: Current user (for personalization)
+            conversation_history: Previous conversation messages, ideally a
+                deque from new_history(); only the last HISTORY_LENGTH are used
+            use_rag: Whether to use RAG for context retrieval
+            
+        Returns:
+            Dict: Response data including message, metadata, and analytics
+        """
+        start_time = time.time()
+        query_lower = query.lower()
+        
+        cache_key = self._response_cache_key(query, user, conversation_history, use_rag)
+        cached = self._cached_response(cache_key, start_time)
+        if cached is not None:
+            return cached
+        
+        rag_task = None
+        try:
+            # Start the RAG lookup first so it overlaps with classification
+            if use_rag:
+                from app.services.rag_service import rag_service
+                rag_task = asyncio.create_task(
+                    asyncio.to_thread(rag_service.get_relevant_context, query)
+                )
+            
+            matches = self._scan(query, query_lower)
+            intent, intent_confidence = self.classify_query_intent(query, matches, query_lower)
+            sentiment, sentiment_score = self.analyze_sentiment(query, matches, query_lower)
+            
+            context_data = await rag_task if rag_task is not None else {}
+            
+            messages = self._build_messages(query, intent, context_data, conversation_history)
+            
+            client = self._get_async_client()
+            response = await client.chat.completions.create(**self._completion_kwargs(messages))
+            
+            ai_message = response.choices[0].message.content
+            tokens_used = response.usage.total_tokens if response.usage else 0
+            
+            response_data = self._build_response_data(
+                query, query_lower, matches, user, ai_message, tokens_used,
+                intent, intent_confidence, sentiment, sentiment_score,
+                context_data, start_time
             )
             
-            # Generate suggested actions
-            suggested_actions = self._generate_suggested_actions(intent, ai_message)
+            self._store_cached_response(cache_key, response_data)
+            return response_data
+            
+        except Exception as e:
+            if rag_task is not None and not rag_task.done():
+                rag_task.cancel()
+            return self._error_response(e, start_time)
+    
+    def generate_response_stream(self,
+                                 query: str,
+                                 user: Optional[Employee] = None,
+                                 conversation_history: Optional[ConversationHistory] = None,
+                                 use_rag: bool = True) -> Iterator[Dict[str, Any]]:
+        """
+        Generate AI response to user query as a stream of frames
+        
+        Intent and sentiment are emitted before the completion starts, tokens
+        are forwarded as they arrive and the usual post-processing runs on
+        the accumulated message once the stream ends.
+        
+        Args:
+            query: User query
+            user: Current user (for personalization)
+            conversation_history: Previous conversation messages, ideally a
+                deque from new_history(); only the last HISTORY_LENGTH are used
+            use_rag: Whether to use RAG for context retrieval
+            
+        Yields:
+            Dict: {"type": "metadata", ...} first, then {"type": "delta", "content": ...}
+            per chunk, and finally {"type": "done", "response": response_data}
+        """
+        start_time = time.time()
+        query_lower = query.lower()
+        
+        cache_key = self._response_cache_key(query, user, conversation_history, use_rag)
+        cached = self._cached_response(cache_key, start_time)
+        if cached is not None:
+            yield {
+                "type": "metadata",
+                "intent": cached["intent"].value,
+                "intent_confidence": cached["intent_confidence"],
+                "sentiment": cached["sentiment"].value,
+                "sentiment_score": cached["sentiment_score"]
+            }
+            yield {"type": "delta", "content": cached["message"]}
+            yield {"type": "done", "response": cached}
+            return
+        
+        try:
+            matches = self._scan(query, query_lower)
+            intent, intent_confidence = self.classify_query_intent(query, matches, query_lower)
+            sentiment, sentiment_score = self.analyze_sentiment(query, matches, query_lower)
             
-            return {
-                "message": ai_message,
-                "intent": intent,
+            yield {
+                "type": "metadata",
+                "intent": intent.value,
                 "intent_confidence": intent_confidence,
-                "sentiment": sentiment,
-                "sentiment_score": sentiment_score,
-                "confidence_score": confidence_score,
-                "processing_time_ms": int(processing_time * 1000),
-                "tokens_used": tokens_used,
-                "model_used": self.model,
-                "context_used": context_data.get("has_context", False),
-                "context_sources": context_data.get("sources", []),
-                "rag_score": context_data.get("relevance_score", 0),
-                "requires_escalation": should_escalate,
-                "escalation_reason": escalation_reason,
-                "suggested_actions": suggested_actions,
-                "complexity_level": self._assess_complexity(query, ai_message),
-                "metadata": {
-                    "user_id": user.id if user else None,
-                    "timestamp": datetime.utcnow().isoformat(),
-                    "session_data": {
-                        "intent_history": [intent.value],
-                        "response_quality": confidence_score
-                    }
-                }
+                "sentiment": sentiment.value,
+                "sentiment_score": sentiment_score
             }
             
+            context_data = {}
+            if use_rag:
+                from app.services.rag_service import rag_service
+                context_data = rag_service.get_relevant_context(query)
+            
+            messages = self._build_messages(query, intent, context_data, conversation_history)
+            
+            client = self._get_client()
+            stream = client.chat.completions.create(stream=True, **self._completion_kwargs(messages))
+            
+            chunks = []
+            tokens_used = 0
+            for chunk in stream:
+                if chunk.choices:
+                    delta = chunk.choices[0].delta.content
+                    if delta:
+                        chunks.append(delta)
+                        yield {"type": "delta", "content": delta}
+                # Groq reports usage on the final chunk
+                x_groq = getattr(chunk, "x_groq", None)
+                usage = getattr(x_groq, "usage", None) if x_groq else None
+                if usage:
+                    tokens_used = usage.total_tokens
+            
+            response_data = self._build_response_data(
+                query, query_lower, matches, user, "".join(chunks), tokens_used,
+                intent, intent_confidence, sentiment, sentiment_score,
+                context_data, start_time
+            )
+            
+            self._store_cached_response(cache_key, response_data)
+            yield {"type": "done", "response": response_data}
+            
         except Exception as e:
-            logger.error(f"Error generating AI response: {e}")
-            
-            # Return fallback response
-            return {
-                "message": "I apologize, but I'm having trouble processing your request right now. Please try again later or contact HR directly for assistance.",
-                "intent": QueryCategoryEnum.GENERAL_HR,
-                "intent_confidence": 0.0,
-                "sentiment": SentimentEnum.NEUTRAL,
-                "sentiment_score": 0.5,
-                "confidence_score": 0.0,
-                "processing_time_ms": int((time.time() - start_time) * 1000),
-                "tokens_used": 0,
-                "model_used": self.model,
-                "context_used": False,
-                "context_sources": [],
-                "rag_score": 0,
-                "requires_escalation": True,
-                "escalation_reason": "AI service error",
-                "suggested_actions": ["Contact HR directly"],
-                "complexity_level": "error",
-                "error": str(e)
-            }
+            yield {"type": "done", "response": self._error_response(e, start_time)}
     
-    def _calculate_confidence(self, response: str, rag_score: float, intent_confidence: float) -> float:
+    def _calculate_confidence(self, response: str, rag_score: float, intent_confidence: float,
+                              response_lower: Optional[str] = None) -> float:
         """
         Calculate confidence score for AI response
         
@@ -324,38 +972,20 @@ If the information provided doesn't fully answer the question, please say so and
             response: AI response text
             rag_score: RAG relevance score
             intent_confidence: Intent classification confidence
+            response_lower: response.lower(), if already computed
             
         Returns:
             float: Confidence score (0-1)
         """
-        # Base confidence from response characteristics
-        base_confidence = 0.5
-        
-        # Adjust based on response length and completeness
-        if len(response) > 50 and "." in response:
-            base_confidence += 0.2
-        
-        # Adjust based on RAG score
-        if rag_score > 0.7:
-            base_confidence += 0.2
-        elif rag_score > 0.5:
-            base_confidence += 0.1
-        
-        # Adjust based on intent confidence
-        base_confidence += intent_confidence * 0.1
-        
-        # Check for uncertainty indicators
-        uncertainty_phrases = [
-            "i'm not sure", "i don't know", "might be", "possibly", "maybe",
-            "you should contact", "please check with", "i recommend contacting"
-        ]
-        
-        response_lower = response.lower()
-        for phrase in uncertainty_phrases:
-            if phrase in response_lower:
-                base_confidence -= 0.1
+        # Check for uncertainty indicators (each distinct phrase counts once)
+        if response_lower is None:
+            response_lower = response.lower()
+        uncertainty_hits = len(set(_UNCERTAINTY_RE.findall(response_lower)))
         
-        return max(0.0, min(1.0, base_confidence))
+        return _confidence_math(
+            float(rag_score or 0.0), float(intent_confidence), uncertainty_hits,
+            len(response) > 50 and "." in response
+        )
     
     def _assess_complexity(self, query: str, response: str) -> str:
         """
@@ -369,17 +999,9 @@ If the information provided doesn't fully answer the question, please say so and
             str: Complexity level (simple, medium, complex)
         """
         # Simple heuristics for complexity assessment
-        query_length = len(query.split())
-        response_length = len(response.split())
-        
-        if query_length <= 5 and response_length <= 50:
-            return "simple"
-        elif query_length <= 15 and response_length <= 150:
-            return "medium"
-        else:
-            return "complex"
+        return COMPLEXITY_LEVELS[_complexity_index(len(query.split()), len(response.split()))]
     
-    def _generate_suggested_actions(self, intent: QueryCategoryEnum, response: str) -> List[str]:
+    def _generate_suggested_actions(self, intent: QueryCategoryEnum, response: str) -> Tuple[str, ...]:
         """
         Generate suggested follow-up actions based on intent and response
         
@@ -388,50 +1010,9 @@ If the information provided doesn't fully answer the question, please say so and
             response: AI response
             
         Returns:
-            List[str]: Suggested actions
+            Tuple[str, ...]: Suggested actions (shared, immutable)
         """
-        suggestions = []
-        
-        intent_actions = {
-            QueryCategoryEnum.LEAVE_MANAGEMENT: [
-                "Submit a leave request",
-                "Check leave balance",
-                "View leave policy"
-            ],
-            QueryCategoryEnum.DOCUMENT_REQUEST: [
-                "Request employment certificate",
-                "Download pay slip",
-                "Access employee handbook"
-            ],
-            QueryCategoryEnum.POLICY_QUESTION: [
-                "Read full policy document",
-                "Contact HR for clarification",
-                "Schedule policy training"
-            ],
-            QueryCategoryEnum.BENEFITS_INQUIRY: [
-                "Review benefits package",
-                "Contact benefits administrator",
-                "Schedule benefits consultation"
-            ],
-            QueryCategoryEnum.PAYROLL_QUERY: [
-                "Check pay slip",
-                "Contact payroll department",
-                "Update tax information"
-            ],
-            QueryCategoryEnum.TRAINING_REQUEST: [
-                "Browse training catalog",
-                "Request training enrollment",
-                "Schedule skills assessment"
-            ]
-        }
-        
-        suggestions = intent_actions.get(intent, [
-            "Contact HR for more information",
-            "Browse employee resources",
-            "Schedule HR consultation"
-        ])
-        
-        return suggestions[:3]  # Return top 3 suggestions
+        return _INTENT_ACTIONS.get(intent, _DEFAULT_ACTIONS)
     
     def generate_query_suggestions(self, partial_query: str, user: Optional[Employee] = None) -> List[str]:
         """
@@ -444,32 +1025,26 @@ If the information provided doesn't fully answer the question, please say so and
         Returns:
             List[str]: Query suggestions
         """
-        # Common HR queries for autocomplete
-        common_queries = [
-            "How do I request sick leave?",
-            "What is the company vacation policy?",
-            "How do I update my personal information?",
-            "Where can I find my pay slip?",
-            "How do I enroll in health insurance?",
-            "What training programs are available?",
-            "How do I report a workplace issue?",
-            "What are my benefits?",
-            "How do I request a employment certificate?",
-            "What is the dress code policy?"
-        ]
+        # Rank common queries by how many typed words prefix one of their words
+        match_counts: Dict[int, int] = {}
+        for token in _WORD_RE.findall(partial_query.lower()):
+            for query_id in self._suggestion_trie.lookup(token):
+                match_counts[query_id] = match_counts.get(query_id, 0) + 1
         
-        # Filter suggestions based on partial query
-        suggestions = []
-        partial_lower = partial_query.lower()
+        if match_counts:
+            ranked = sorted(match_counts, key=lambda query_id: (-match_counts[query_id], query_id))
+            suggestions = [self.common_queries[query_id] for query_id in ranked]
+        elif not partial_query.strip():
+            suggestions = list(self.common_queries)
+        else:
+            suggestions = []
         
-        for query in common_queries:
-            if partial_lower in query.lower() or any(
-                word in query.lower() for word in partial_lower.split()
-            ):
-                suggestions.append(query)
+        if len(suggestions) >= 5:
+            return suggestions[:5]
         
         # Add RAG-based suggestions if available
         try:
+            from app.services.rag_service import rag_service
             rag_suggestions = rag_service.suggest_related_queries(partial_query, limit=3)
             suggestions.extend(rag_suggestions)
         except Exception:
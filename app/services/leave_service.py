@@ -5,11 +5,15 @@ This service handles all leave-related business logic including leave requests,
 approvals, balance calculations, and policy validations.
 """
 
+import os
+import time
 import secrets
-from datetime import datetime, date, timedelta
-from typing import List, Dict, Any, Optional, Tuple
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_, func, extract
+import threading
+from dataclasses import dataclass, field, replace
+from datetime import datetime, date
+from typing import List, Dict, Any, Optional, Tuple, FrozenSet, Iterable
+from sqlalchemy.orm import Session, make_transient_to_detached
+from sqlalchemy import and_, func, select, exists, case, update, lambda_stmt, bindparam
 
 from app.models.employee import Employee
 from app.models.leave import LeaveRequest, LeaveType, LeaveBalance, LeaveStatus, LeavePriority
@@ -18,19 +22,69 @@ from app.utils.logger import get_logger
 
 logger = get_logger(__name__)
 
+# Leave statuses that reserve dates (used by overlap checks)
+ACTIVE_LEAVE_STATUSES = (LeaveStatus.PENDING, LeaveStatus.APPROVED)
+
+# Role titles (casefolded) allowed to act on leave requests beyond their own team
+HR_ROLE_TITLES = frozenset({"hr", "human resources"})
+ADMIN_ROLE_TITLES = frozenset({"admin", "administrator"})
+
+# Oracle rejects IN lists longer than 1000 expressions (ORA-01795)
+IN_CLAUSE_CHUNK_SIZE = 1000
+
+# Seconds a LeaveType row is served from the in-process cache
+LEAVE_TYPE_CACHE_TTL = int(os.getenv("LEAVE_TYPE_CACHE_TTL", "300"))
+
+@dataclass(frozen=True, slots=True)
+class LeaveConfig:
+    """
+    Immutable leave calendar rules, safe to share across concurrent requests
+    """
+    weekend_mask: int = (1 << 5) | (1 << 6)  # Bit per weekday (0=Monday): Saturday, Sunday
+    holiday_ordinals: FrozenSet[int] = frozenset()  # Public holiday date ordinals
+    min_advance_notice_days: int = 1
+    max_advance_notice_days: int = 365
+    
+    # Derived lookup tables used by calculate_leave_days
+    workdays_per_week: int = field(init=False, repr=False, compare=False)
+    workday_table: Tuple[Tuple[int, ...], ...] = field(init=False, repr=False, compare=False)
+    
+    def __post_init__(self):
+        object.__setattr__(self, "workdays_per_week", 7 - bin(self.weekend_mask & 0x7F).count("1"))
+        object.__setattr__(self, "workday_table", self._build_workday_table())
+    
+    def _build_workday_table(self) -> Tuple[Tuple[int, ...], ...]:
+        """
+        Build the partial-week working day lookup table
+        
+        Returns:
+            Tuple: table[start_weekday][n] = working days among n consecutive
+            days (0-6) beginning on start_weekday
+        """
+        table = []
+        for start_weekday in range(7):
+            counts = [0]
+            for offset in range(6):
+                is_weekend = (1 << ((start_weekday + offset) % 7)) & self.weekend_mask
+                counts.append(counts[-1] + (not is_weekend))
+            table.append(tuple(counts))
+        return tuple(table)
+
 class LeaveService:
     """
     Leave management service for handling all leave-related operations
     """
     
-    def __init__(self):
-        # Business rules configuration
-        self.weekend_days = [5, 6]  # Saturday, Sunday (0=Monday)
-        self.public_holidays = []  # Will be loaded from database/config
+    def __init__(self, config: Optional[LeaveConfig] = None):
+        # Calendar rules are immutable; updates swap in a new LeaveConfig
+        self.config = config or LeaveConfig()
         
-        # Policy validation settings
-        self.min_advance_notice_days = 1
-        self.max_advance_notice_days = 365
+        # Leave types are near-static reference data: cache detached copies by id
+        self._leave_type_cache: Dict[int, Tuple[float, LeaveType]] = {}
+        self._leave_type_cache_lock = threading.Lock()
+        
+        # (date ordinal, "LRYYYYMMDD") - the request ID prefix changes once a day
+        self._request_id_prefix: Tuple[int, str] = (0, "")
         
     def generate_request_id(self) -> str:
         """
@@ -39,13 +93,86 @@ class LeaveService:
         Returns:
             str: Unique request ID
         """
-        timestamp = datetime.now().strftime("%Y%m%d")
-        random_suffix = secrets.token_hex(3).upper()
-        return f"LR{timestamp}{random_suffix}"
+        today = date.today()
+        ordinal, prefix = self._request_id_prefix
+        if ordinal != today.toordinal():
+            prefix = f"LR{today.year:04d}{today.month:02d}{today.day:02d}"
+            self._request_id_prefix = (today.toordinal(), prefix)
+        return prefix + secrets.token_hex(3).upper()
+    
+    def get_leave_type(self, db: Session, leave_type_id: int) -> Optional[LeaveType]:
+        """
+        Get a leave type by ID, served from a TTL cache
+        
+        Args:
+            db: Database session
+            leave_type_id: Leave type ID
+            
+        Returns:
+            Optional[LeaveType]: Leave type attached to db, or None if not found
+        """
+        with self._leave_type_cache_lock:
+            cached = self._leave_type_cache.get(leave_type_id)
+        if cached is not None and cached[0] > time.monotonic():
+            # Attach the cached state to this session without a SELECT
+            return db.merge(cached[1], load=False)
+        
+        leave_type = db.query(LeaveType).filter(LeaveType.id == leave_type_id).first()
+        if leave_type is not None:
+            snapshot = LeaveType(**{
+                column.key: getattr(leave_type, column.key)
+                for column in LeaveType.__table__.columns
+            })
+            make_transient_to_detached(snapshot)
+            with self._leave_type_cache_lock:
+                self._leave_type_cache[leave_type_id] = (
+                    time.monotonic() + LEAVE_TYPE_CACHE_TTL, snapshot
+                )
+        return leave_type
+    
+    def invalidate_leave_type_cache(self, leave_type_id: Optional[int] = None):
+        """
+        Drop cached leave types after they are modified
+        
+        Args:
+            leave_type_id: Leave type to drop, or None to clear the whole cache
+        """
+        with self._leave_type_cache_lock:
+            if leave_type_id is None:
+                self._leave_type_cache.clear()
+            else:
+                self._leave_type_cache.pop(leave_type_id, None)
+    
+    @staticmethod
+    def _role_title(employee: Employee) -> str:
+        """
+        Get an employee's role title normalized for permission checks
+        
+        Args:
+            employee: Employee to inspect
+            
+        Returns:
+            str: Casefolded role title, or "" if the employee has no role
+        """
+        role = employee.role
+        return role.title.casefold() if role and role.title else ""
+    
+    def set_public_holidays(self, holidays: Iterable[date]):
+        """
+        Replace the public holiday calendar
+        
+        Args:
+            holidays: Public holiday dates (loaded from database/config)
+        """
+        self.config = replace(
+            self.config,
+            holiday_ordinals=frozenset(holiday.toordinal() for holiday in holidays)
+        )
     
     def calculate_leave_days(self, start_date: date, end_date: date, 
                            exclude_weekends: bool = True,
-                           exclude_holidays: bool = True) -> float:
+                           exclude_holidays: bool = True,
+                           config: Optional[LeaveConfig] = None) -> float:
         """
         Calculate number of leave days between two dates
         
@@ -54,29 +181,36 @@ class LeaveService:
             end_date: Leave end date
             exclude_weekends: Whether to exclude weekends
             exclude_holidays: Whether to exclude public holidays
+            config: Calendar rules to apply (defaults to the service config)
             
         Returns:
             float: Number of leave days
         """
+        config = config or self.config
         if start_date > end_date:
             return 0
         
-        total_days = 0
-        current_date = start_date
-        
-        while current_date <= end_date:
-            # Check if it's a weekend
-            if exclude_weekends and current_date.weekday() in self.weekend_days:
-                current_date += timedelta(days=1)
-                continue
-            
-            # Check if it's a public holiday
-            if exclude_holidays and current_date in self.public_holidays:
-                current_date += timedelta(days=1)
-                continue
-            
-            total_days += 1
-            current_date += timedelta(days=1)
+        calendar_days = (end_date - start_date).days + 1
+        
+        # Whole weeks contribute a fixed number of working days; the
+        # remaining partial week comes from the lookup table
+        if exclude_weekends:
+            full_weeks, remainder = divmod(calendar_days, 7)
+            total_days = (full_weeks * config.workdays_per_week +
+                          config.workday_table[start_date.weekday()][remainder])
+        else:
+            total_days = calendar_days
+        
+        # Subtract public holidays in range not already excluded as weekends
+        if exclude_holidays and config.holiday_ordinals:
+            start_ordinal = start_date.toordinal()
+            end_ordinal = end_date.toordinal()
+            # Ordinal 1 (0001-01-01) is a Monday, so weekday() == (ordinal - 1) % 7
+            total_days -= sum(
+                1 for holiday in config.holiday_ordinals
+                if start_ordinal <= holiday <= end_ordinal
+                and not (exclude_weekends and (1 << ((holiday - 1) % 7)) & config.weekend_mask)
+            )
         
         return total_days
     
@@ -86,6 +220,10 @@ class LeaveService:
         """
         Validate leave request against company policies
         
+        Checks run cheapest first: in-memory rules on the leave type are
+        evaluated before the database round-trip, which is skipped once
+        any violation has been found.
+        
         Args:
             db: Database session
             employee: Employee requesting leave
@@ -102,7 +240,7 @@ class LeaveService:
         suggestions = []
         
         # Get leave type
-        leave_type = db.query(LeaveType).filter(LeaveType.id == leave_type_id).first()
+        leave_type = self.get_leave_type(db, leave_type_id)
         if not leave_type:
             violations.append("Invalid leave type")
             return LeavePolicyValidation(
@@ -135,33 +273,45 @@ class LeaveService:
                 f"Maximum {leave_type.max_consecutive_days} consecutive days allowed for {leave_type.name}"
             )
         
+        # Rejected on in-memory rules alone: skip the database round-trip
+        if violations:
+            suggestions.append("Consider adjusting leave dates or duration")
+            return LeavePolicyValidation(
+                is_valid=False,
+                violations=violations,
+                warnings=warnings,
+                suggestions=suggestions,
+                max_allowed_days=leave_type.max_consecutive_days,
+                advance_notice_requirement=leave_type.min_advance_notice_days
+            )
+        
+        # Year usage, balance and overlap come back from a single round-trip
+        year_usage, available_days, has_overlap = self._get_policy_state(
+            db, employee.id, leave_type_id, start_date, end_date
+        )
+        
         # Check annual limit
         if leave_type.max_days_per_year > 0:
-            current_year = start_date.year
-            year_usage = self.get_leave_usage_for_year(db, employee.id, leave_type_id, current_year)
-            
             if year_usage + total_days > leave_type.max_days_per_year:
                 violations.append(
                     f"Annual limit of {leave_type.max_days_per_year} days exceeded for {leave_type.name}"
                 )
         
         # Check leave balance
-        leave_balance = self.get_leave_balance(db, employee.id, leave_type_id, start_date.year)
-        if leave_balance and leave_balance.available_days < total_days:
+        if available_days is not None and available_days < total_days:
             violations.append(
-                f"Insufficient leave balance. Available: {leave_balance.available_days} days, Requested: {total_days} days"
+                f"Insufficient leave balance. Available: {available_days} days, Requested: {total_days} days"
             )
         
         # Check for overlapping leave requests
-        overlapping_requests = self.get_overlapping_requests(db, employee.id, start_date, end_date)
-        if overlapping_requests:
+        if has_overlap:
             violations.append("Overlapping leave request exists")
         
         # Generate suggestions
         if violations:
             suggestions.append("Consider adjusting leave dates or duration")
-            if leave_balance:
-                suggestions.append(f"Available balance: {leave_balance.available_days} days")
+            if available_days is not None:
+                suggestions.append(f"Available balance: {available_days} days")
         
         return LeavePolicyValidation(
             is_valid=len(violations) == 0,
@@ -169,10 +319,60 @@ class LeaveService:
             warnings=warnings,
             suggestions=suggestions,
             max_allowed_days=leave_type.max_consecutive_days,
-            available_balance=leave_balance.available_days if leave_balance else None,
+            available_balance=available_days,
             advance_notice_requirement=leave_type.min_advance_notice_days
         )
     
+    def _get_policy_state(self, db: Session, employee_id: int, leave_type_id: int,
+                          start_date: date, end_date: date) -> Tuple[float, Optional[float], bool]:
+        """
+        Load the database state needed for policy validation in one query
+        
+        Combines get_leave_usage_for_year, get_leave_balance and
+        get_overlapping_requests as scalar subqueries of a single SELECT.
+        
+        Args:
+            db: Database session
+            employee_id: Employee ID
+            leave_type_id: Leave type ID
+            start_date: Requested start date (its year selects usage and balance)
+            end_date: Requested end date
+            
+        Returns:
+            Tuple[float, Optional[float], bool]: (approved days used this year,
+            available balance or None if no balance exists, overlap exists)
+        """
+        year = start_date.year
+        
+        year_usage = select(func.sum(LeaveRequest.total_days)).where(
+            LeaveRequest.employee_id == employee_id,
+            LeaveRequest.leave_type_id == leave_type_id,
+            LeaveRequest.status == LeaveStatus.APPROVED,
+            LeaveRequest.start_date >= date(year, 1, 1),
+            LeaveRequest.start_date < date(year + 1, 1, 1)
+        ).scalar_subquery()
+        
+        available_days = select(
+            LeaveBalance.allocated_days + LeaveBalance.carry_forward_days -
+            LeaveBalance.used_days - LeaveBalance.pending_days
+        ).where(
+            LeaveBalance.employee_id == employee_id,
+            LeaveBalance.leave_type_id == leave_type_id,
+            LeaveBalance.year == year
+        ).scalar_subquery()
+        
+        has_overlap = case(
+            (exists().where(self._overlap_filter(employee_id, start_date, end_date)), 1),
+            else_=0
+        )
+        
+        row = db.execute(select(year_usage, available_days, has_overlap)).one()
+        return (
+            float(row[0]) if row[0] else 0.0,
+            float(row[1]) if row[1] is not None else None,
+            bool(row[2])
+        )
+    
     def create_leave_request(self, db: Session, employee: Employee, 
                            leave_data: LeaveRequestCreate) -> Tuple[bool, LeaveRequest, List[str]]:
         """
@@ -205,8 +405,8 @@ class LeaveService:
             if not validation.is_valid:
                 return False, None, validation.violations
             
-            # Get leave type to determine approval requirements
-            leave_type = db.query(LeaveType).filter(LeaveType.id == leave_data.leave_type_id).first()
+            # Get leave type to determine approval requirements (cached by validation)
+            leave_type = self.get_leave_type(db, leave_data.leave_type_id)
             
             # Create leave request
             leave_request = LeaveRequest(
@@ -231,13 +431,14 @@ class LeaveService:
             )
             
             db.add(leave_request)
-            db.commit()
-            db.refresh(leave_request)
             
-            # Update leave balance (mark as pending)
+            # Update leave balance (mark as pending) in the same transaction
             self.update_leave_balance_pending(db, employee.id, leave_data.leave_type_id, 
                                             leave_data.start_date.year, total_days, add=True)
             
+            db.commit()
+            db.refresh(leave_request)
+            
             logger.info(f"Leave request created: {leave_request.request_id} for employee {employee.employee_id}")
             
             return True, leave_request, []
@@ -275,37 +476,45 @@ class LeaveService:
             original_days = float(leave_request.total_days)
             original_year = leave_request.start_date.year
             
-            # Update fields
-            update_dict = update_data.dict(exclude_unset=True)
-            
-            for field, value in update_dict.items():
-                if hasattr(leave_request, field):
-                    setattr(leave_request, field, value)
+            # Only columns of leave_requests can be written
+            update_dict = {
+                field: value
+                for field, value in update_data.dict(exclude_unset=True).items()
+                if field in LeaveRequest.__table__.columns
+            }
             
             # Recalculate total days if dates changed
+            new_days = original_days
             if 'start_date' in update_dict or 'end_date' in update_dict or 'is_half_day' in update_dict:
-                if leave_request.is_half_day:
-                    leave_request.total_days = 0.5
+                start_date = update_dict.get('start_date', leave_request.start_date)
+                end_date = update_dict.get('end_date', leave_request.end_date)
+                is_half_day = update_dict.get('is_half_day', leave_request.is_half_day)
+                leave_type_id = update_dict.get('leave_type_id', leave_request.leave_type_id)
+                
+                if is_half_day:
+                    new_days = 0.5
                 else:
-                    leave_request.total_days = self.calculate_leave_days(
-                        leave_request.start_date, leave_request.end_date
-                    )
+                    new_days = self.calculate_leave_days(start_date, end_date)
+                update_dict['total_days'] = new_days
                 
                 # Validate updated request
                 validation = self.validate_leave_policy(
-                    db, leave_request.employee, leave_request.leave_type_id,
-                    leave_request.start_date, leave_request.end_date, 
-                    float(leave_request.total_days)
+                    db, leave_request.employee, leave_type_id,
+                    start_date, end_date, new_days
                 )
                 
                 if not validation.is_valid:
                     return False, validation.violations
             
-            leave_request.updated_at = datetime.utcnow()
-            db.commit()
+            # Single parameterized UPDATE instead of per-attribute ORM history;
+            # the default synchronize strategy refreshes leave_request in place
+            db.execute(
+                update(LeaveRequest)
+                .where(LeaveRequest.id == leave_request.id)
+                .values(**update_dict)
+            )
             
             # Update leave balance if days changed
-            new_days = float(leave_request.total_days)
             if original_days != new_days:
                 # Remove original pending days
                 self.update_leave_balance_pending(
@@ -319,6 +528,7 @@ class LeaveService:
                     leave_request.start_date.year, new_days, add=True
                 )
             
+            db.commit()
             logger.info(f"Leave request updated: {leave_request.request_id}")
             return True, []
             
@@ -347,6 +557,7 @@ class LeaveService:
             
             # Check approval permissions
             can_approve = False
+            role_title = self._role_title(approver)
             
             # Manager approval
             if leave_request.manager_id == approver.id and not leave_request.manager_approval_date:
@@ -355,14 +566,14 @@ class LeaveService:
                 can_approve = True
             
             # HR approval
-            elif leave_request.hr_approval_required and approver.role.title.lower() in ['hr', 'human resources']:
+            elif leave_request.hr_approval_required and role_title in HR_ROLE_TITLES:
                 leave_request.hr_approver_id = approver.id
                 leave_request.hr_approval_date = datetime.utcnow()
                 leave_request.hr_comments = comments
                 can_approve = True
             
             # Admin can approve anything
-            elif approver.role.title.lower() in ['admin', 'administrator']:
+            elif role_title in ADMIN_ROLE_TITLES:
                 if not leave_request.manager_approval_date:
                     leave_request.manager_approval_date = datetime.utcnow()
                     leave_request.manager_comments = comments or "Approved by admin"
@@ -385,14 +596,9 @@ class LeaveService:
                 leave_request.approved_date = datetime.utcnow()
                 
                 # Update leave balance (move from pending to used)
-                self.update_leave_balance_pending(
+                self._move_pending_to_used(
                     db, leave_request.employee_id, leave_request.leave_type_id,
-                    leave_request.start_date.year, float(leave_request.total_days), add=False
-                )
-                
-                self.update_leave_balance_used(
-                    db, leave_request.employee_id, leave_request.leave_type_id,
-                    leave_request.start_date.year, float(leave_request.total_days), add=True
+                    leave_request.start_date.year, float(leave_request.total_days)
                 )
             
             db.commit()
@@ -430,7 +636,7 @@ class LeaveService:
             # Add rejection comments
             if leave_request.manager_id == approver.id:
                 leave_request.manager_comments = comments
-            elif approver.role.title.lower() in ['hr', 'human resources']:
+            elif self._role_title(approver) in HR_ROLE_TITLES:
                 leave_request.hr_comments = comments
             
             # Remove pending days from balance
@@ -474,7 +680,6 @@ class LeaveService:
             original_status = leave_request.status
             leave_request.status = LeaveStatus.CANCELLED
             leave_request.cancellation_reason = reason
-            leave_request.updated_at = datetime.utcnow()
             
             # Update leave balance based on original status
             if original_status == LeaveStatus.PENDING:
@@ -500,8 +705,117 @@ class LeaveService:
             logger.error(f"Error cancelling leave request: {e}")
             return False, [f"Error cancelling leave request: {str(e)}"]
     
+    def bulk_cancel_leave_requests(self, db: Session, request_ids: List[str],
+                                   reason: str, user: Employee) -> Tuple[int, List[str]]:
+        """
+        Cancel many leave requests in one transaction
+        
+        Requests are loaded with IN queries, cancelled with a single UPDATE,
+        and balance deltas are summed per (employee, leave type, year) and
+        written with one executemany UPDATE instead of a lock, update and
+        commit per request.
+        
+        Args:
+            db: Database session
+            request_ids: Leave request IDs to cancel
+            reason: Cancellation reason
+            user: User cancelling the requests
+            
+        Returns:
+            Tuple[int, List[str]]: (number cancelled, errors for skipped requests)
+        """
+        try:
+            unique_ids = list(dict.fromkeys(request_ids))
+            leave_requests = []
+            for offset in range(0, len(unique_ids), IN_CLAUSE_CHUNK_SIZE):
+                chunk = unique_ids[offset:offset + IN_CLAUSE_CHUNK_SIZE]
+                leave_requests.extend(
+                    db.query(LeaveRequest).filter(LeaveRequest.request_id.in_(chunk)).all()
+                )
+            
+            errors = []
+            found_ids = {leave_request.request_id for leave_request in leave_requests}
+            errors.extend(
+                f"{request_id}: Leave request not found"
+                for request_id in unique_ids if request_id not in found_ids
+            )
+            
+            # HR and admins may cancel anyone's request; others only their own
+            can_cancel_any = self._role_title(user) in HR_ROLE_TITLES | ADMIN_ROLE_TITLES
+            cancel_ids = []
+            # (employee_id, leave_type_id, year) -> [pending days, used days]
+            balance_deltas: Dict[Tuple[int, int, int], List[float]] = {}
+            for leave_request in leave_requests:
+                if not leave_request.can_be_cancelled():
+                    errors.append(f"{leave_request.request_id}: Leave request cannot be cancelled")
+                    continue
+                if leave_request.employee_id != user.id and not can_cancel_any:
+                    errors.append(f"{leave_request.request_id}: Insufficient permissions to cancel this request")
+                    continue
+                
+                cancel_ids.append(leave_request.id)
+                key = (leave_request.employee_id, leave_request.leave_type_id,
+                       leave_request.start_date.year)
+                delta = balance_deltas.setdefault(key, [0.0, 0.0])
+                # Pending requests release pending days, approved ones used days
+                if leave_request.status == LeaveStatus.PENDING:
+                    delta[0] += float(leave_request.total_days)
+                else:
+                    delta[1] += float(leave_request.total_days)
+            
+            if not cancel_ids:
+                return 0, errors
+            
+            for offset in range(0, len(cancel_ids), IN_CLAUSE_CHUNK_SIZE):
+                db.execute(
+                    update(LeaveRequest)
+                    .where(LeaveRequest.id.in_(cancel_ids[offset:offset + IN_CLAUSE_CHUNK_SIZE]))
+                    .values(status=LeaveStatus.CANCELLED, cancellation_reason=reason)
+                    .execution_options(synchronize_session="fetch")
+                )
+            
+            # One statement executed for every balance row; deltas are applied
+            # in SQL and clamped at zero like update_leave_balance_*
+            balances = LeaveBalance.__table__
+            remaining_pending = balances.c.pending_days - bindparam("pending_delta")
+            remaining_used = balances.c.used_days - bindparam("used_delta")
+            db.connection().execute(
+                update(balances)
+                .where(
+                    balances.c.employee_id == bindparam("b_employee_id"),
+                    balances.c.leave_type_id == bindparam("b_leave_type_id"),
+                    balances.c.year == bindparam("b_year")
+                )
+                .values(
+                    pending_days=case((remaining_pending > 0, remaining_pending), else_=0),
+                    used_days=case((remaining_used > 0, remaining_used), else_=0)
+                ),
+                [
+                    {
+                        "b_employee_id": employee_id,
+                        "b_leave_type_id": leave_type_id,
+                        "b_year": year,
+                        "pending_delta": pending_delta,
+                        "used_delta": used_delta
+                    }
+                    for (employee_id, leave_type_id, year), (pending_delta, used_delta)
+                    in balance_deltas.items()
+                ]
+            )
+            
+            db.commit()
+            logger.info(f"Bulk cancelled {len(cancel_ids)} leave requests by {user.employee_id}")
+            
+            return len(cancel_ids), errors
+            
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Error bulk cancelling leave requests: {e}")
+            return 0, [f"Error bulk cancelling leave requests: {str(e)}"]
+    
     def get_leave_balance(self, db: Session, employee_id: int, 
-                         leave_type_id: int, year: int) -> Optional[LeaveBalance]:
+                         leave_type_id: int, year: int,
+                         for_update: bool = False) -> Optional[LeaveBalance]:
         """
         Get leave balance for employee, leave type, and year
         
@@ -510,17 +824,23 @@ class LeaveService:
             employee_id: Employee ID
             leave_type_id: Leave type ID
             year: Year
+            for_update: Lock the row (SELECT ... FOR UPDATE) until the
+                transaction ends, for read-modify-write updates
             
         Returns:
             Optional[LeaveBalance]: Leave balance or None if not found
         """
-        return db.query(LeaveBalance).filter(
-            and_(
-                LeaveBalance.employee_id == employee_id,
-                LeaveBalance.leave_type_id == leave_type_id,
-                LeaveBalance.year == year
-            )
-        ).first()
+        # lambda_stmt caches the compiled SQL; the arguments become bound parameters
+        stmt = lambda_stmt(lambda: select(LeaveBalance).where(
+            LeaveBalance.employee_id == employee_id,
+            LeaveBalance.leave_type_id == leave_type_id,
+            LeaveBalance.year == year
+        ))
+        if for_update:
+            # populate_existing so a row already in the session is refreshed
+            # with the locked values rather than served stale
+            stmt += lambda s: s.with_for_update().execution_options(populate_existing=True)
+        return db.execute(stmt).scalars().first()
     
     def update_leave_balance_pending(self, db: Session, employee_id: int,
                                    leave_type_id: int, year: int,
@@ -528,6 +848,9 @@ class LeaveService:
         """
         Update pending days in leave balance
         
+        Changes are left in the session; the caller commits them together
+        with the rest of its business operation.
+        
         Args:
             db: Database session
             employee_id: Employee ID
@@ -536,15 +859,12 @@ class LeaveService:
             days: Number of days to add/subtract
             add: True to add days, False to subtract
         """
-        balance = self.get_leave_balance(db, employee_id, leave_type_id, year)
+        balance = self.get_leave_balance(db, employee_id, leave_type_id, year, for_update=True)
         if balance:
             if add:
                 balance.pending_days += days
             else:
                 balance.pending_days = max(0, balance.pending_days - days)
-            
-            balance.updated_at = datetime.utcnow()
-            db.commit()
     
     def update_leave_balance_used(self, db: Session, employee_id: int,
                                 leave_type_id: int, year: int,
@@ -552,6 +872,9 @@ class LeaveService:
         """
         Update used days in leave balance
         
+        Changes are left in the session; the caller commits them together
+        with the rest of its business operation.
+        
         Args:
             db: Database session
             employee_id: Employee ID
@@ -560,15 +883,41 @@ class LeaveService:
             days: Number of days to add/subtract
             add: True to add days, False to subtract
         """
-        balance = self.get_leave_balance(db, employee_id, leave_type_id, year)
+        balance = self.get_leave_balance(db, employee_id, leave_type_id, year, for_update=True)
         if balance:
             if add:
                 balance.used_days += days
             else:
                 balance.used_days = max(0, balance.used_days - days)
-            
-            balance.updated_at = datetime.utcnow()
-            db.commit()
+    
+    def _move_pending_to_used(self, db: Session, employee_id: int,
+                              leave_type_id: int, year: int, days: float):
+        """
+        Move approved days from pending to used in one UPDATE statement
+        
+        The caller is responsible for committing.
+        
+        Args:
+            db: Database session
+            employee_id: Employee ID
+            leave_type_id: Leave type ID
+            year: Year
+            days: Number of days approved
+        """
+        remaining_pending = LeaveBalance.pending_days - days
+        db.execute(
+            update(LeaveBalance)
+            .where(
+                LeaveBalance.employee_id == employee_id,
+                LeaveBalance.leave_type_id == leave_type_id,
+                LeaveBalance.year == year
+            )
+            .values(
+                pending_days=case((remaining_pending > 0, remaining_pending), else_=0),
+                used_days=LeaveBalance.used_days + days
+            )
+            .execution_options(synchronize_session="fetch")
+        )
     
     def get_leave_usage_for_year(self, db: Session, employee_id: int,
                                leave_type_id: int, year: int) -> float:
@@ -584,14 +933,17 @@ class LeaveService:
         Returns:
             float: Total days used
         """
-        result = db.query(func.sum(LeaveRequest.total_days)).filter(
-            and_(
-                LeaveRequest.employee_id == employee_id,
-                LeaveRequest.leave_type_id == leave_type_id,
-                LeaveRequest.status == LeaveStatus.APPROVED,
-                extract('year', LeaveRequest.start_date) == year
-            )
-        ).scalar()
+        # Range on the bare column so the start_date index can be used
+        year_start = date(year, 1, 1)
+        next_year_start = date(year + 1, 1, 1)
+        
+        result = db.execute(lambda_stmt(lambda: select(func.sum(LeaveRequest.total_days)).where(
+            LeaveRequest.employee_id == employee_id,
+            LeaveRequest.leave_type_id == leave_type_id,
+            LeaveRequest.status == LeaveStatus.APPROVED,
+            LeaveRequest.start_date >= year_start,
+            LeaveRequest.start_date < next_year_start
+        ))).scalar()
         
         return float(result) if result else 0.0
     
@@ -611,22 +963,56 @@ class LeaveService:
         Returns:
             List[LeaveRequest]: Overlapping requests
         """
-        query = db.query(LeaveRequest).filter(
-            and_(
-                LeaveRequest.employee_id == employee_id,
-                LeaveRequest.status.in_([LeaveStatus.PENDING, LeaveStatus.APPROVED]),
-                or_(
-                    and_(LeaveRequest.start_date <= start_date, LeaveRequest.end_date >= start_date),
-                    and_(LeaveRequest.start_date <= end_date, LeaveRequest.end_date >= end_date),
-                    and_(LeaveRequest.start_date >= start_date, LeaveRequest.end_date <= end_date)
-                )
-            )
-        )
-        
+        # Same predicate as _overlap_filter, spelled out so lambda_stmt can cache it
+        stmt = lambda_stmt(lambda: select(LeaveRequest).where(
+            LeaveRequest.employee_id == employee_id,
+            LeaveRequest.status.in_(ACTIVE_LEAVE_STATUSES),
+            LeaveRequest.start_date <= end_date,
+            LeaveRequest.end_date >= start_date
+        ))
         if exclude_request_id:
-            query = query.filter(LeaveRequest.id != exclude_request_id)
+            stmt += lambda s: s.where(LeaveRequest.id != exclude_request_id)
         
-        return query.all()
+        return list(db.execute(stmt).scalars().all())
+    
+    def has_overlapping_requests(self, db: Session, employee_id: int,
+                                 start_date: date, end_date: date,
+                                 exclude_request_id: int = None) -> bool:
+        """
+        Check whether an employee has a leave request overlapping a date range
+        
+        Args:
+            db: Database session
+            employee_id: Employee ID
+            start_date: Start date to check
+            end_date: End date to check
+            exclude_request_id: Request ID to exclude from check
+            
+        Returns:
+            bool: True if at least one pending or approved request overlaps
+        """
+        return db.query(LeaveRequest.id).filter(
+            self._overlap_filter(employee_id, start_date, end_date, exclude_request_id)
+        ).limit(1).scalar() is not None
+    
+    @staticmethod
+    def _overlap_filter(employee_id: int, start_date: date, end_date: date,
+                        exclude_request_id: int = None):
+        """
+        Build the filter for active requests overlapping [start_date, end_date]
+        
+        Two inclusive ranges overlap exactly when each starts no later than
+        the other ends.
+        """
+        criteria = [
+            LeaveRequest.employee_id == employee_id,
+            LeaveRequest.status.in_(ACTIVE_LEAVE_STATUSES),
+            LeaveRequest.start_date <= end_date,
+            LeaveRequest.end_date >= start_date
+        ]
+        if exclude_request_id:
+            criteria.append(LeaveRequest.id != exclude_request_id)
+        return and_(*criteria)
 
 # Global leave service instance
 leave_service = LeaveService()
\ No newline at end of file
@@ -6,29 +6,151 @@ for various HR events like leave approvals, document requests, survey invitation
 """
 
 import os
+import time
+import queue
+import threading
 import smtplib
-import json
-from datetime import datetime, timedelta
-from typing import List, Dict, Any, Optional, Union
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from email.mime.base import MIMEBase
-from email import encoders
+import re
+import html
+import shutil
+import hashlib
+import string
+from datetime import datetime, date, timedelta
+from typing import List, Dict, Any, Optional, Tuple, Union
+from email.message import EmailMessage
 from pathlib import Path
-from jinja2 import Environment, FileSystemLoader, Template
+from functools import lru_cache
+from jinja2 import Environment, FileSystemLoader, FileSystemBytecodeCache, ModuleLoader, Template, meta
+from markupsafe import Markup, escape
 import asyncio
+import weakref
 from concurrent.futures import ThreadPoolExecutor
-from sqlalchemy.orm import Session
+from sqlalchemy import and_, or_, exists, func, select, true
+from sqlalchemy.orm import Session, contains_eager, joinedload
+from app.config.database import SessionLocal
 from app.models.employee import Employee
-from app.models.leave import LeaveRequest
+from app.models.leave import LeaveRequest, LeaveBalance, LeaveType
 from app.models.document import DocumentRequest
-from app.models.survey import Survey, SurveyResponse
+from app.models.survey import Survey, SurveyResponse, SurveyStatus
 from app.models.query import QueryLog
 from app.utils.logger import get_logger
-from app.utils.helpers import format_date, format_currency
+from app.utils.helpers import format_display_date, format_currency
+
+try:
+    import aiosmtplib
+except ImportError:  # Async sends fall back to the sync sender on the thread pool
+    aiosmtplib = None
+
+try:
+    from selectolax.parser import HTMLParser
+except ImportError:  # Plain-text fallback parts are extracted with BeautifulSoup or a regex
+    HTMLParser = None
+
+try:
+    from bs4 import BeautifulSoup
+except ImportError:
+    BeautifulSoup = None
 
 logger = get_logger(__name__)
 
+# Email template file and default subject for each notification type
+TEMPLATE_MAPPING = {
+    "leave_request_submitted": ("leave_request_submitted.html", "Leave Request Submitted"),
+    "leave_request_approved": ("leave_request_approved.html", "Leave Request Approved ✅"),
+    "leave_request_rejected": ("leave_request_rejected.html", "Leave Request Status Update"),
+    "manager_approval_needed": ("manager_approval_needed.html", "Leave Approval Required"),
+    "document_request_completed": ("document_request_completed.html", "Document Ready for Download 📄"),
+    "survey_invitation": ("survey_invitation.html", "Survey Invitation - Your Feedback Matters 📊"),
+    "password_reset": ("password_reset.html", "Password Reset Request 🔐"),
+    "escalation_notification": ("escalation_notification.html", "🚨 HR Escalation Alert - Immediate Attention Required"),
+    "welcome_new_employee": ("welcome_new_employee.html", "Welcome to the Team! 🎉"),
+    "reminder_leave_expiring": ("reminder_leave_expiring.html", "Reminder: Annual Leave Expiring Soon"),
+    "reminder_survey_pending": ("reminder_survey_pending.html", "Reminder: Survey Response Pending")
+}
+
+DEFAULT_EMAIL_TEMPLATE = ("generic_notification.html", "Notification from HR")
+
+# Subjects that include the request ID
+SUBJECT_OVERRIDES = {
+    "leave_request_submitted": "Leave Request {request_id} Submitted",
+    "leave_request_approved": "Leave Request {request_id} Approved ✅",
+    "leave_request_rejected": "Leave Request {request_id} Status Update"
+}
+
+# Email dispatch resolved once per notification type:
+# (template file, default subject, subject format or None)
+EMAIL_SPECS = {
+    notification_type: (template_name, subject, SUBJECT_OVERRIDES.get(notification_type))
+    for notification_type, (template_name, subject) in TEMPLATE_MAPPING.items()
+}
+DEFAULT_EMAIL_SPEC = (*DEFAULT_EMAIL_TEMPLATE, None)
+
+# Used when a notification template cannot be loaded
+FALLBACK_EMAIL_TEMPLATE = """<html><body>
+<h2>{{ subject }}</h2>
+<p>{{ message }}</p>
+<p>Best regards,<br>{{ company_name }}</p>
+</body></html>
+"""
+
+# SMS templates (shorter versions)
+SMS_TEMPLATES = {
+    "leave_request_approved": "✅ Your leave request {request_id} from {start_date} to {end_date} has been approved. Enjoy your time off! - {company_name}",
+    "leave_request_rejected": "Your leave request {request_id} could not be approved. Please contact your manager for details. - {company_name}",
+    "escalation_notification": "🚨 URGENT: Employee {employee_name} needs immediate HR assistance. Please check the HR portal. - {company_name}",
+    "document_request_completed": "📄 Your requested document {document_title} is ready for download. Check your email for details. - {company_name}",
+    "password_reset": "🔐 Password reset requested for your account. Check your email for the reset link. If you didn't request this, contact IT support. - {company_name}",
+    "reminder_survey_pending": "📊 Reminder: Please complete the {survey_title} survey by {deadline}. Your feedback matters! - {company_name}"
+}
+
+# SMS templates split once into (literal, field, format_spec) parts
+SMS_TEMPLATE_PARTS = {
+    notification_type: tuple(
+        (literal, field, spec) for literal, field, spec, _ in string.Formatter().parse(template)
+    )
+    for notification_type, template in SMS_TEMPLATES.items()
+}
+
+# Pooled SMTP connections: idle connections kept, and when one is retired
+SMTP_POOL_SIZE = int(os.getenv("SMTP_POOL_SIZE", "5"))
+SMTP_MAX_MESSAGES_PER_CONNECTION = int(os.getenv("SMTP_MAX_MESSAGES_PER_CONNECTION", "10000"))
+SMTP_CONNECTION_MAX_AGE = float(os.getenv("SMTP_CONNECTION_MAX_AGE", "300"))
+SMTP_TIMEOUT = float(os.getenv("SMTP_TIMEOUT", "30"))
+
+# Worker threads for blocking sends (SMS, and email without aiosmtplib)
+NOTIFICATION_MAX_WORKERS = int(os.getenv("NOTIFICATION_MAX_WORKERS", "16"))
+# Hand notify_* sends to Celery workers instead of sending inline
+NOTIFICATION_QUEUE_ENABLED = os.getenv("NOTIFICATION_QUEUE_ENABLED", "False").lower() == "true"
+
+# Most pending-survey reminders sent per survey on each reminder run
+SURVEY_REMINDER_LIMIT = int(os.getenv("SURVEY_REMINDER_LIMIT", "50"))
+
+# Seconds the HR escalation recipient list is reused before reloading
+ESCALATION_RECIPIENTS_CACHE_TTL = int(os.getenv("ESCALATION_RECIPIENTS_CACHE_TTL", "300"))
+
+# Upper bound on concurrent sends when fanning out to many recipients
+NOTIFY_CONCURRENCY = int(os.getenv("NOTIFY_CONCURRENCY", "32"))
+
+# Per-recipient template fields; everything else is shared by a broadcast
+RECIPIENT_FIELDS = ("employee_name", "employee_id")
+RENDER_CACHE_SIZE = int(os.getenv("NOTIFICATION_RENDER_CACHE_SIZE", "256"))
+
+# Markup handling when deriving plain-text templates from the HTML ones
+_HTML_HEAD_RE = re.compile(r"<head\b.*?</head>", re.IGNORECASE | re.DOTALL)
+_HTML_LINK_RE = re.compile(r'<a\b[^>]*?href="([^"]*)"[^>]*>(.*?)</a>', re.IGNORECASE | re.DOTALL)
+_HTML_BREAK_RE = re.compile(r"<br\s*/?>|</(?:p|div|h[1-6]|li|tr)>", re.IGNORECASE)
+_HTML_TAG_RE = re.compile(r"<[^<]+?>")
+_BLANK_LINES_RE = re.compile(r"\n\s*\n\s*\n+")
+
+# Email templates shipped with the application, and their ahead-of-time
+# compiled form (built by python -m app.scripts.compile_templates)
+DEFAULT_TEMPLATE_DIR = Path(__file__).resolve().parent.parent / "templates" / "notifications"
+COMPILED_TEMPLATES_PATH = DEFAULT_TEMPLATE_DIR.parent / "compiled.zip"
+
+# Directory for compiled template bytecode (defaults to the system temp dir)
+JINJA_BYTECODE_CACHE_DIR = os.getenv("JINJA_BYTECODE_CACHE_DIR")
+
+
 class NotificationService:
     """
     Comprehensive notification service for HR AI Assistant
@@ -44,25 +166,47 @@ class NotificationService:
         self.from_email = os.getenv("FROM_EMAIL", self.smtp_username)
         self.from_name = os.getenv("FROM_NAME", "HR AI Assistant")
         
+        # Idle authenticated SMTP connections as (server, created_at, messages_sent);
+        # LIFO so the most recently used (least likely timed out) is reused first
+        self._smtp_pool: queue.LifoQueue = queue.LifoQueue(maxsize=SMTP_POOL_SIZE)
+        # Async connections belong to one event loop: loop -> (idle queue, slots)
+        self._async_smtp_pools: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+        
         # SMS configuration (for services like Twilio)
         self.sms_enabled = os.getenv("SMS_ENABLED", "False").lower() == "true"
         self.sms_service = os.getenv("SMS_SERVICE", "twilio")
         self.twilio_account_sid = os.getenv("TWILIO_ACCOUNT_SID")
         self.twilio_auth_token = os.getenv("TWILIO_AUTH_TOKEN")
         self.twilio_phone_number = os.getenv("TWILIO_PHONE_NUMBER")
+        # One client (and HTTP session) shared by every SMS
+        self._twilio = self._create_twilio_client()
         
         # Template configuration
-        self.template_dir = Path("app/templates/notifications")
+        self.template_dir = Path(os.getenv("NOTIFICATION_TEMPLATE_DIR", str(DEFAULT_TEMPLATE_DIR)))
         self.template_dir.mkdir(parents=True, exist_ok=True)
         
-        # Initialize Jinja2 environment
+        # A configured bytecode cache directory must exist before the first dump
+        if JINJA_BYTECODE_CACHE_DIR:
+            Path(JINJA_BYTECODE_CACHE_DIR).mkdir(parents=True, exist_ok=True)
+        
+        # Initialize Jinja2 environment; compiled bytecode survives restarts.
+        # Templates are compiled once at startup, so skip per-lookup mtime checks
         self.jinja_env = Environment(
-            loader=FileSystemLoader(str(self.template_dir)),
-            autoescape=True
+            loader=self._create_template_loader(),
+            autoescape=True,
+            auto_reload=False,
+            bytecode_cache=FileSystemBytecodeCache(
+                directory=JINJA_BYTECODE_CACHE_DIR,
+                pattern="__jinja2_%s.cache"
+            )
         )
         
-        # Thread pool for async operations
-        self.executor = ThreadPoolExecutor(max_workers=5)
+        # Thread pool for async operations, created on first use
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+        # Event loop for sync callers of async sends, hosted on a daemon thread
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[threading.Thread] = None
         
         # Company information
         self.company_name = os.getenv("COMPANY_NAME", "Our Company")
@@ -70,6 +214,15 @@ class NotificationService:
         self.hr_email = os.getenv("HR_EMAIL", "hr@company.com")
         self.hr_phone = os.getenv("HR_PHONE", "+91-1234567890")
         
+        # Company fields shared by every notification, built once
+        self._company_data = {
+            "company_name": self.company_name,
+            "company_website": self.company_website,
+            "hr_email": self.hr_email,
+            "hr_phone": self.hr_phone,
+            "portal_link": f"{self.company_website}/portal"
+        }
+        
         # Notification preferences
         self.notification_preferences = {
             "leave_requests": {"email": True, "sms": False, "in_app": True},
@@ -81,377 +234,226 @@ class NotificationService:
         
         # Initialize templates
         self._create_default_templates()
+        self._templates = self._precompile_templates()
+        self._template_variables = {
+            name: self._find_template_variables(name) for name in self._templates
+        }
+        # Plain-text parts render from templates derived once from the HTML
+        # source, so no HTML is parsed per send
+        self.text_jinja_env = Environment(autoescape=False, trim_blocks=True, lstrip_blocks=True)
+        self._text_templates = {
+            name: self._compile_text_template(name) for name in self._templates
+        }
+        self._render_cached = lru_cache(maxsize=RENDER_CACHE_SIZE)(self._render_invariant)
+        self._fallback_template: Optional[Template] = None
+        
+        # (expiry, HR employees) for escalations; HR staffing rarely changes
+        self._escalation_recipients: Optional[Tuple[float, List[Employee]]] = None
+        self._escalation_recipients_lock = threading.Lock()
         
         logger.info("Notification service initialized")
     
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        """Thread pool for blocking sends, created on first use"""
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=NOTIFICATION_MAX_WORKERS,
+                        thread_name_prefix="notify"
+                    )
+        return self._executor
+    
+    def _get_background_loop(self) -> asyncio.AbstractEventLoop:
+        """
+        Get the shared background event loop, starting it on first use
+        
+        Sync callers submit coroutines here instead of creating a loop per
+        call, so async SMTP connections pooled on it stay warm between calls.
+        """
+        if self._loop is None:
+            with self._executor_lock:
+                if self._loop is None:
+                    loop = asyncio.new_event_loop()
+                    self._loop_thread = threading.Thread(
+                        target=loop.run_forever, name="notify-loop", daemon=True
+                    )
+                    self._loop_thread.start()
+                    self._loop = loop
+        return self._loop
+    
+    def _create_template_loader(self):
+        """
+        Use the precompiled template archive when it is current
+        
+        The archive only covers the packaged templates and is ignored if any
+        template file is newer, so edits are never masked by a stale build.
+        """
+        if (self.template_dir.resolve() == DEFAULT_TEMPLATE_DIR and
+                COMPILED_TEMPLATES_PATH.exists()):
+            compiled_at = COMPILED_TEMPLATES_PATH.stat().st_mtime
+            if all(path.stat().st_mtime <= compiled_at
+                   for path in DEFAULT_TEMPLATE_DIR.glob("*.html")):
+                logger.info("Using precompiled notification templates")
+                return ModuleLoader(str(COMPILED_TEMPLATES_PATH))
+        return FileSystemLoader(str(self.template_dir))
+    
+    def _get_template_source(self, template_name: str) -> str:
+        """Read a template's source (ModuleLoader cannot provide it)"""
+        return (self.template_dir / template_name).read_text(encoding="utf-8")
+    
     def _create_default_templates(self):
-        """Create default email templates if they don't exist"""
-        templates = {
-            "leave_request_submitted.html": """
-<!DOCTYPE html>
-<html>
-<head>
-    <meta charset="UTF-8">
-    <title>Leave Request Submitted</title>
-    <style>
-        body { font-family: Arial, sans-serif; line-height: 1.6; color: #333; }
-        .container { max-width: 600px; margin: 0 auto; padding: 20px; }
-        .header { background-color: #4CAF50; color: white; padding: 20px; text-align: center; }
-        .content { background-color: #f9f9f9; padding: 20px; }
-        .footer { background-color: #333; color: white; padding: 15px; text-align: center; font-size: 12px; }
-        .details { background-color: white; padding: 15px; margin: 10px 0; border-left: 4px solid #4CAF50; }
-        .button { display: inline-block; padding: 10px 20px; background-color: #4CAF50; color: white; text-decoration: none; border-radius: 5px; }
-    </style>
-</head>
-<body>
-    <div class="container">
-        <div class="header">
-            <h1>Leave Request Submitted</h1>
-        </div>
-        <div class="content">
-            <p>Dear {{ employee_name }},</p>
-            <p>Your leave request has been successfully submitted and is pending approval.</p>
-            
-            <div class="details">
-                <h3>Leave Details:</h3>
-                <p><strong>Request ID:</strong> {{ request_id }}</p>
-                <p><strong>Leave Type:</strong> {{ leave_type }}</p>
-                <p><strong>Start Date:</strong> {{ start_date }}</p>
-                <p><strong>End Date:</strong> {{ end_date }}</p>
-                <p><strong>Total Days:</strong> {{ total_days }}</p>
-                <p><strong>Reason:</strong> {{ reason }}</p>
-            </div>
-            
-            <p>Your request will be reviewed by your manager. You will receive an email notification once a decision is made.</p>
-            
-            <p><a href="{{ portal_link }}" class="button">View Request Status</a></p>
-        </div>
-        <div class="footer">
-            <p>{{ company_name }} HR Department | {{ hr_email }} | {{ hr_phone }}</p>
-        </div>
-    </div>
-</body>
-</html>
-            """,
-            
-            "leave_request_approved.html": """
-<!DOCTYPE html>
-<html>
-<head>
-    <meta charset="UTF-8">
-    <title>Leave Request Approved</title>
-    <style>
-        body { font-family: Arial, sans-serif; line-height: 1.6; color: #333; }
-        .container { max-width: 600px; margin: 0 auto; padding: 20px; }
-        .header { background-color: #4CAF50; color: white; padding: 20px; text-align: center; }
-        .content { background-color: #f9f9f9; padding: 20px; }
-        .footer { background-color: #333; color: white; padding: 15px; text-align: center; font-size: 12px; }
-        .details { background-color: white; padding: 15px; margin: 10px 0; border-left: 4px solid #4CAF50; }
-        .approved { color: #4CAF50; font-weight: bold; }
-    </style>
-</head>
-<body>
-    <div class="container">
-        <div class="header">
-            <h1>✅ Leave Request Approved</h1>
-        </div>
-        <div class="content">
-            <p>Dear {{ employee_name }},</p>
-            <p class="approved">Great news! Your leave request has been approved.</p>
-            
-            <div class="details">
-                <h3>Approved Leave Details:</h3>
-                <p><strong>Request ID:</strong> {{ request_id }}</p>
-                <p><strong>Leave Type:</strong> {{ leave_type }}</p>
-                <p><strong>Start Date:</strong> {{ start_date }}</p>
-                <p><strong>End Date:</strong> {{ end_date }}</p>
-                <p><strong>Total Days:</strong> {{ total_days }}</p>
-                <p><strong>Approved By:</strong> {{ approver_name }}</p>
-                <p><strong>Approval Date:</strong> {{ approval_date }}</p>
-                {% if manager_comments %}
-                <p><strong>Manager Comments:</strong> {{ manager_comments }}</p>
-                {% endif %}
-            </div>
-            
-            <p>Please ensure proper handover of your responsibilities before your leave begins.</p>
-            
-            <p>Have a great time off!</p>
-        </div>
-        <div class="footer">
-            <p>{{ company_name }} HR Department | {{ hr_email }} | {{ hr_phone }}</p>
-        </div>
-    </div>
-</body>
-</html>
-            """,
-            
-            "leave_request_rejected.html": """
-<!DOCTYPE html>
-<html>
-<head>
-    <meta charset="UTF-8">
-    <title>Leave Request Status Update</title>
-    <style>
-        body { font-family: Arial, sans-serif; line-height: 1.6; color: #333; }
-        .container { max-width: 600px; margin: 0 auto; padding: 20px; }
-        .header { background-color: #f44336; color: white; padding: 20px; text-align: center; }
-        .content { background-color: #f9f9f9; padding: 20px; }
-        .footer { background-color: #333; color: white; padding: 15px; text-align: center; font-size: 12px; }
-        .details { background-color: white; padding: 15px; margin: 10px 0; border-left: 4px solid #f44336; }
-        .rejected { color: #f44336; font-weight: bold; }
-    </style>
-</head>
-<body>
-    <div class="container">
-        <div class="header">
-            <h1>Leave Request Status Update</h1>
-        </div>
-        <div class="content">
-            <p>Dear {{ employee_name }},</p>
-            <p>We regret to inform you that your leave request could not be approved at this time.</p>
-            
-            <div class="details">
-                <h3>Request Details:</h3>
-                <p><strong>Request ID:</strong> {{ request_id }}</p>
-                <p><strong>Leave Type:</strong> {{ leave_type }}</p>
-                <p><strong>Requested Dates:</strong> {{ start_date }} to {{ end_date }}</p>
-                <p><strong>Total Days:</strong> {{ total_days }}</p>
-                <p class="rejected"><strong>Status:</strong> Not Approved</p>
-                {% if rejection_reason %}
-                <p><strong>Reason:</strong> {{ rejection_reason }}</p>
-                {% endif %}
-            </div>
-            
-            <p>If you have any questions or would like to discuss alternative dates, please contact your manager or HR.</p>
-            
-            <p>We appreciate your understanding.</p>
-        </div>
-        <div class="footer">
-            <p>{{ company_name }} HR Department | {{ hr_email }} | {{ hr_phone }}</p>
-        </div>
-    </div>
-</body>
-</html>
-            """,
-            
-            "document_request_completed.html": """
-<!DOCTYPE html>
-<html>
-<head>
-    <meta charset="UTF-8">
-    <title>Document Request Completed</title>
-    <style>
-        body { font-family: Arial, sans-serif; line-height: 1.6; color: #333; }
-        .container { max-width: 600px; margin: 0 auto; padding: 20px; }
-        .header { background-color: #2196F3; color: white; padding: 20px; text-align: center; }
-        .content { background-color: #f9f9f9; padding: 20px; }
-        .footer { background-color: #333; color: white; padding: 15px; text-align: center; font-size: 12px; }
-        .details { background-color: white; padding: 15px; margin: 10px 0; border-left: 4px solid #2196F3; }
-        .button { display: inline-block; padding: 10px 20px; background-color: #2196F3; color: white; text-decoration: none; border-radius: 5px; }
-    </style>
-</head>
-<body>
-    <div class="container">
-        <div class="header">
-            <h1>📄 Document Ready for Download</h1>
-        </div>
-        <div class="content">
-            <p>Dear {{ employee_name }},</p>
-            <p>Your requested document has been processed and is ready for download.</p>
-            
-            <div class="details">
-                <h3>Document Details:</h3>
-                <p><strong>Request ID:</strong> {{ request_id }}</p>
-                <p><strong>Document:</strong> {{ document_title }}</p>
-                <p><strong>Type:</strong> {{ document_type }}</p>
-                <p><strong>Processed By:</strong> {{ processed_by }}</p>
-                <p><strong>Completion Date:</strong> {{ completion_date }}</p>
-                {% if completion_notes %}
-                <p><strong>Notes:</strong> {{ completion_notes }}</p>
-                {% endif %}
-            </div>
-            
-            <p>{% if download_link %}<a href="{{ download_link }}" class="button">Download Document</a>{% else %}Please contact HR to collect your document.{% endif %}</p>
-            
-            <p>If you have any questions, please don't hesitate to contact us.</p>
-        </div>
-        <div class="footer">
-            <p>{{ company_name }} HR Department | {{ hr_email }} | {{ hr_phone }}</p>
-        </div>
-    </div>
-</body>
-</html>
-            """,
-            
-            "survey_invitation.html": """
-<!DOCTYPE html>
-<html>
-<head>
-    <meta charset="UTF-8">
-    <title>Survey Invitation</title>
-    <style>
-        body { font-family: Arial, sans-serif; line-height: 1.6; color: #333; }
-        .container { max-width: 600px; margin: 0 auto; padding: 20px; }
-        .header { background-color: #FF9800; color: white; padding: 20px; text-align: center; }
-        .content { background-color: #f9f9f9; padding: 20px; }
-        .footer { background-color: #333; color: white; padding: 15px; text-align: center; font-size: 12px; }
-        .details { background-color: white; padding: 15px; margin: 10px 0; border-left: 4px solid #FF9800; }
-        .button { display: inline-block; padding: 12px 25px; background-color: #FF9800; color: white; text-decoration: none; border-radius: 5px; font-weight: bold; }
-    </style>
-</head>
-<body>
-    <div class="container">
-        <div class="header">
-            <h1>📊 Your Feedback Matters</h1>
-        </div>
-        <div class="content">
-            <p>Dear {{ employee_name }},</p>
-            <p>You have been invited to participate in an important survey. Your feedback helps us improve our workplace and better serve our employees.</p>
-            
-            <div class="details">
-                <h3>Survey Details:</h3>
-                <p><strong>Title:</strong> {{ survey_title }}</p>
-                <p><strong>Description:</strong> {{ survey_description }}</p>
-                <p><strong>Estimated Time:</strong> {{ estimated_duration }} minutes</p>
-                <p><strong>Deadline:</strong> {{ deadline }}</p>
-                {% if is_anonymous %}
-                <p><strong>Type:</strong> Anonymous Survey</p>
-                {% endif %}
-            </div>
-            
-            <p style="text-align: center;">
-                <a href="{{ survey_link }}" class="button">Take Survey Now</a>
-            </p>
-            
-            <p>Your participation is valuable and appreciated. All responses will be treated confidentially.</p>
-        </div>
-        <div class="footer">
-            <p>{{ company_name }} HR Department | {{ hr_email }} | {{ hr_phone }}</p>
-        </div>
-    </div>
-</body>
-</html>
-            """,
-            
-            "password_reset.html": """
-<!DOCTYPE html>
-<html>
-<head>
-    <meta charset="UTF-8">
-    <title>Password Reset Request</title>
-    <style>
-        body { font-family: Arial, sans-serif; line-height: 1.6; color: #333; }
-        .container { max-width: 600px; margin: 0 auto; padding: 20px; }
-        .header { background-color: #9C27B0; color: white; padding: 20px; text-align: center; }
-        .content { background-color: #f9f9f9; padding: 20px; }
-        .footer { background-color: #333; color: white; padding: 15px; text-align: center; font-size: 12px; }
-        .warning { background-color: #fff3cd; border: 1px solid #ffeaa7; padding: 15px; margin: 10px 0; border-radius: 5px; }
-        .button { display: inline-block; padding: 12px 25px; background-color: #9C27B0; color: white; text-decoration: none; border-radius: 5px; font-weight: bold; }
-    </style>
-</head>
-<body>
-    <div class="container">
-        <div class="header">
-            <h1>🔐 Password Reset Request</h1>
-        </div>
-        <div class="content">
-            <p>Dear {{ employee_name }},</p>
-            <p>We received a request to reset your password for your HR AI Assistant account.</p>
-            
-            <div class="warning">
-                <p><strong>Security Notice:</strong> If you did not request this password reset, please ignore this email and contact IT support immediately.</p>
-            </div>
-            
-            <p>To reset your password, click the button below:</p>
-            
-            <p style="text-align: center;">
-                <a href="{{ reset_link }}" class="button">Reset Password</a>
-            </p>
-            
-            <p><strong>This link will expire in 1 hour for security reasons.</strong></p>
-            
-            <p>If the button doesn't work, you can copy and paste this link into your browser:</p>
-            <p style="word-break: break-all; background-color: #f0f0f0; padding: 10px;">{{ reset_link }}</p>
-        </div>
-        <div class="footer">
-            <p>{{ company_name }} IT Support | {{ hr_email }} | {{ hr_phone }}</p>
-        </div>
-    </div>
-</body>
-</html>
-            """,
-            
-            "escalation_notification.html": """
-<!DOCTYPE html>
-<html>
-<head>
-    <meta charset="UTF-8">
-    <title>HR Escalation Alert</title>
-    <style>
-        body { font-family: Arial, sans-serif; line-height: 1.6; color: #333; }
-        .container { max-width: 600px; margin: 0 auto; padding: 20px; }
-        .header { background-color: #f44336; color: white; padding: 20px; text-align: center; }
-        .content { background-color: #f9f9f9; padding: 20px; }
-        .footer { background-color: #333; color: white; padding: 15px; text-align: center; font-size: 12px; }
-        .alert { background-color: #ffebee; border: 1px solid #f44336; padding: 15px; margin: 10px 0; border-radius: 5px; }
-        .urgent { color: #f44336; font-weight: bold; font-size: 18px; }
-    </style>
-</head>
-<body>
-    <div class="container">
-        <div class="header">
-            <h1>🚨 HR Escalation Alert</h1>
-        </div>
-        <div class="content">
-            <p class="urgent">URGENT: HR Attention Required</p>
-            
-            <div class="alert">
-                <h3>Escalation Details:</h3>
-                <p><strong>Employee:</strong> {{ employee_name }} ({{ employee_id }})</p>
-                <p><strong>Query:</strong> {{ query_text }}</p>
-                <p><strong>Reason for Escalation:</strong> {{ escalation_reason }}</p>
-                <p><strong>AI Confidence:</strong> {{ confidence_score }}%</p>
-                <p><strong>Timestamp:</strong> {{ timestamp }}</p>
-                {% if sentiment %}
-                <p><strong>Employee Sentiment:</strong> {{ sentiment }}</p>
-                {% endif %}
-            </div>
-            
-            <p>This query requires human intervention. Please review and respond promptly.</p>
-            
-            <p><strong>Action Required:</strong> Contact the employee directly or through the HR portal to address their concern.</p>
-        </div>
-        <div class="footer">
-            <p>{{ company_name }} AI Assistant | Automated Alert System</p>
-        </div>
-    </div>
-</body>
-</html>
-            """
-        }
+        """Copy the packaged email templates into a custom template directory"""
+        if self.template_dir.resolve() == DEFAULT_TEMPLATE_DIR:
+            return
+        
+        # Skip the per-file checks when the packaged set is unchanged since the last copy
+        sources = sorted(DEFAULT_TEMPLATE_DIR.glob("*.html"))
+        fingerprint = []
+        for source in sources:
+            stat = source.stat()
+            fingerprint.append((source.name, stat.st_size, stat.st_mtime_ns))
+        digest = hashlib.sha256(repr(fingerprint).encode()).hexdigest()
+        manifest_path = self.template_dir / ".manifest"
+        try:
+            if manifest_path.read_text(errors="ignore") == digest:
+                return
+        except OSError:
+            pass
         
-        # Create template files
-        for filename, content in templates.items():
-            template_path = self.template_dir / filename
+        # Existing files are kept so local customisations survive restarts
+        for source in sources:
+            template_path = self.template_dir / source.name
             if not template_path.exists():
-                with open(template_path, 'w', encoding='utf-8') as f:
-                    f.write(content)
-                logger.info(f"Created template: {filename}")
+                shutil.copyfile(source, template_path)
+                logger.info(f"Created template: {source.name}")
+        manifest_path.write_text(digest)
+    
+    def _precompile_templates(self) -> Dict[str, Template]:
+        """Compile every mapped email template once at startup"""
+        templates = {}
+        for template_name, _ in TEMPLATE_MAPPING.values():
+            try:
+                templates[template_name] = self.jinja_env.get_template(template_name)
+            except Exception as e:
+                logger.debug(f"Template {template_name} not precompiled: {e}")
+        return templates
+    
+    def _find_template_variables(self, template_name: str) -> frozenset:
+        """Get the names of the context variables a template reads"""
+        source = self._get_template_source(template_name)
+        return frozenset(meta.find_undeclared_variables(self.jinja_env.parse(source)))
+    
+    def _compile_text_template(self, template_name: str) -> Template:
+        """Derive a plain-text Jinja template from an HTML template's source"""
+        source = self._get_template_source(template_name)
+        text = _HTML_HEAD_RE.sub("", source)
+        text = _HTML_LINK_RE.sub(r"\2: \1", text)
+        text = _HTML_BREAK_RE.sub("\n", text)
+        text = html.unescape(_HTML_TAG_RE.sub("", text))
+        text = "\n".join(line.strip() for line in text.splitlines())
+        text = _BLANK_LINES_RE.sub("\n\n", text).strip()
+        return self.text_jinja_env.from_string(text)
+    
+    def _render_template(self, template_name: str, data: Dict[str, Any]) -> Tuple[str, str]:
+        """
+        Render a template to HTML and plain text, reusing shared output
+        
+        Broadcasts (survey invitations, reminders) render the same data for
+        every recipient apart from RECIPIENT_FIELDS. The rest of the output
+        is rendered once per distinct value of the variables the template
+        actually reads, with placeholders that are filled per recipient.
+        
+        Args:
+            template_name: Template file name
+            data: Template context
+            
+        Returns:
+            Tuple[str, str]: (html_content, text_content)
+        """
+        variables = self._template_variables.get(template_name)
+        recipient_fields = tuple(
+            field for field in RECIPIENT_FIELDS
+            if variables is not None and field in variables and data.get(field) is not None
+        )
+        try:
+            shared = tuple(sorted(
+                (name, data.get(name)) for name in variables if name not in recipient_fields
+            )) if variables is not None else None
+            hash(shared)
+        except TypeError:
+            shared = None
+        
+        if shared is None:
+            html_content = self._get_template(template_name).render(**data)
+            text_template = self._text_templates.get(template_name)
+            if text_template is None:
+                return html_content, self._html_to_text(html_content)
+            return html_content, text_template.render(**data)
+        
+        html_content, text_content = self._render_cached(template_name, shared, recipient_fields)
+        for field in recipient_fields:
+            placeholder = self._placeholder(field)
+            value = data[field]
+            html_content = html_content.replace(placeholder, str(escape(value)))
+            text_content = text_content.replace(placeholder, str(value))
+        return html_content, text_content
+    
+    def _render_invariant(self, template_name: str, shared: tuple,
+                          recipient_fields: tuple) -> Tuple[str, str]:
+        """Render a template with placeholders for the per-recipient fields"""
+        context = dict(shared)
+        context.update((field, Markup(self._placeholder(field))) for field in recipient_fields)
+        html_content = self._get_template(template_name).render(**context)
+        return html_content, self._text_templates[template_name].render(**context)
+    
+    @staticmethod
+    def _placeholder(field: str) -> str:
+        """Marker substituted for a per-recipient field in cached output"""
+        return f"\x00{field}\x00"
     
     def _get_template(self, template_name: str) -> Template:
         """Get Jinja2 template by name"""
+        template = self._templates.get(template_name)
+        if template is not None:
+            return template
+        
         try:
             return self.jinja_env.get_template(template_name)
         except Exception as e:
             logger.error(f"Failed to load template {template_name}: {e}")
-            # Return a basic fallback template
-            return self.jinja_env.from_string("""
-            <html><body>
-            <h2>{{ subject }}</h2>
-            <p>{{ message }}</p>
-            <p>Best regards,<br>{{ company_name }}</p>
-            </body></html>
-            """)
+            # Return a basic fallback template, compiled only once
+            if self._fallback_template is None:
+                self._fallback_template = self.jinja_env.from_string(FALLBACK_EMAIL_TEMPLATE)
+            return self._fallback_template
+    
+    def _build_email_message(self, to_email: str, subject: str, html_content: str,
+                             text_content: str = None, attachments: List[str] = None) -> EmailMessage:
+        """Build the MIME message for an outgoing email"""
+        # Create message
+        msg = EmailMessage()
+        msg['Subject'] = subject
+        msg['From'] = f"{self.from_name} <{self.from_email}>"
+        msg['To'] = to_email
+        
+        # Plain text part first, HTML as the preferred alternative
+        msg.set_content(text_content or "")
+        msg.add_alternative(html_content, subtype='html')
+        
+        # Add attachments (base64 encoded by the C codec)
+        if attachments:
+            for file_path in attachments:
+                if os.path.exists(file_path):
+                    with open(file_path, 'rb') as attachment:
+                        msg.add_attachment(
+                            attachment.read(),
+                            maintype='application',
+                            subtype='octet-stream',
+                            filename=os.path.basename(file_path)
+                        )
+        
+        return msg
     
     def _send_email(self, to_email: str, subject: str, html_content: str,
                    text_content: str = None, attachments: List[str] = None) -> bool:
@@ -473,41 +475,141 @@ class NotificationService:
                 logger.warning("SMTP credentials not configured, skipping email")
                 return False
             
-            # Create message
-            msg = MIMEMultipart('alternative')
-            msg['Subject'] = subject
-            msg['From'] = f"{self.from_name} <{self.from_email}>"
-            msg['To'] = to_email
-            
-            # Add text content
-            if text_content:
-                text_part = MIMEText(text_content, 'plain')
-                msg.attach(text_part)
-            
-            # Add HTML content
-            html_part = MIMEText(html_content, 'html')
-            msg.attach(html_part)
-            
-            # Add attachments
-            if attachments:
-                for file_path in attachments:
-                    if os.path.exists(file_path):
-                        with open(file_path, 'rb') as attachment:
-                            part = MIMEBase('application', 'octet-stream')
-                            part.set_payload(attachment.read())
-                            encoders.encode_base64(part)
-                            part.add_header(
-                                'Content-Disposition',
-                                f'attachment; filename= {os.path.basename(file_path)}'
-                            )
-                            msg.attach(part)
-            
-            # Send email
-            with smtplib.SMTP(self.smtp_host, self.smtp_port) as server:
-                if self.smtp_use_tls:
-                    server.starttls()
-                server.login(self.smtp_username, self.smtp_password)
+            msg = self._build_email_message(to_email, subject, html_content, text_content, attachments)
+            
+            # Send email over a pooled connection
+            server, created_at, messages_sent = self._acquire_smtp()
+            try:
                 server.send_message(msg)
+            except Exception:
+                # Connection state is unknown after a failed transaction
+                self._close_smtp(server)
+                raise
+            self._release_smtp(server, created_at, messages_sent + 1)
+            
+            logger.info(f"Email sent successfully to {to_email}")
+            return True
+            
+        except Exception as e:
+            logger.error(f"Failed to send email to {to_email}: {e}")
+            return False
+    
+    def _connect_smtp(self) -> smtplib.SMTP:
+        """Open and authenticate a new SMTP connection"""
+        server = smtplib.SMTP(self.smtp_host, self.smtp_port, timeout=SMTP_TIMEOUT)
+        try:
+            if self.smtp_use_tls:
+                server.starttls()
+            server.login(self.smtp_username, self.smtp_password)
+        except Exception:
+            self._close_smtp(server)
+            raise
+        return server
+    
+    def _acquire_smtp(self) -> tuple:
+        """
+        Take a live connection from the pool, or open a new one
+        
+        Returns:
+            tuple: (server, created_at, messages_sent)
+        """
+        while True:
+            try:
+                server, created_at, messages_sent = self._smtp_pool.get_nowait()
+            except queue.Empty:
+                return self._connect_smtp(), time.monotonic(), 0
+            
+            if time.monotonic() - created_at < SMTP_CONNECTION_MAX_AGE:
+                try:
+                    if server.noop()[0] == 250:
+                        return server, created_at, messages_sent
+                except (smtplib.SMTPException, OSError):
+                    pass
+            self._close_smtp(server)
+    
+    def _release_smtp(self, server: smtplib.SMTP, created_at: float, messages_sent: int):
+        """Return a connection to the pool unless it is due to be retired"""
+        if (messages_sent >= SMTP_MAX_MESSAGES_PER_CONNECTION or
+                time.monotonic() - created_at >= SMTP_CONNECTION_MAX_AGE):
+            self._close_smtp(server)
+            return
+        try:
+            self._smtp_pool.put_nowait((server, created_at, messages_sent))
+        except queue.Full:
+            self._close_smtp(server)
+    
+    @staticmethod
+    def _close_smtp(server: smtplib.SMTP):
+        """Close an SMTP connection, ignoring errors from a dead peer"""
+        try:
+            server.quit()
+        except Exception:
+            server.close()
+    
+    def close(self):
+        """Close all pooled SMTP connections and stop the worker threads"""
+        if self._loop is not None:
+            loop, self._loop = self._loop, None
+            asyncio.run_coroutine_threadsafe(self.aclose(), loop).result(timeout=SMTP_TIMEOUT)
+            loop.call_soon_threadsafe(loop.stop)
+            self._loop_thread.join()
+            loop.close()
+            self._loop_thread = None
+        
+        while True:
+            try:
+                server, _, _ = self._smtp_pool.get_nowait()
+            except queue.Empty:
+                break
+            self._close_smtp(server)
+        
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+    
+    async def _send_email_async(self, to_email: str, subject: str, html_content: str,
+                                text_content: str = None, attachments: List[str] = None) -> bool:
+        """
+        Send email using a native asyncio SMTP client
+        
+        Falls back to the sync sender on the thread pool when aiosmtplib is
+        not installed.
+        
+        Args:
+            to_email: Recipient email address
+            subject: Email subject
+            html_content: HTML email content
+            text_content: Plain text content (optional)
+            attachments: List of file paths to attach (optional)
+            
+        Returns:
+            bool: True if email sent successfully
+        """
+        if aiosmtplib is None:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self.executor, self._send_email,
+                to_email, subject, html_content, text_content, attachments
+            )
+        
+        try:
+            if not self.smtp_username or not self.smtp_password:
+                logger.warning("SMTP credentials not configured, skipping email")
+                return False
+            
+            msg = self._build_email_message(to_email, subject, html_content, text_content, attachments)
+            
+            # SMTP is sequential per connection: each send holds one connection,
+            # and the semaphore caps open connections at SMTP_POOL_SIZE
+            pool, slots = self._get_async_smtp_pool()
+            async with slots:
+                client, created_at, messages_sent = await self._acquire_smtp_async(pool)
+                try:
+                    await client.send_message(msg)
+                except Exception:
+                    await self._close_smtp_async(client)
+                    raise
+                await self._release_smtp_async(pool, client, created_at, messages_sent + 1)
             
             logger.info(f"Email sent successfully to {to_email}")
             return True
@@ -516,6 +618,75 @@ class NotificationService:
             logger.error(f"Failed to send email to {to_email}: {e}")
             return False
     
+    def _get_async_smtp_pool(self) -> tuple:
+        """Get the (idle connection queue, connection slots) for the running loop"""
+        loop = asyncio.get_running_loop()
+        pool = self._async_smtp_pools.get(loop)
+        if pool is None:
+            pool = (asyncio.LifoQueue(maxsize=SMTP_POOL_SIZE), asyncio.Semaphore(SMTP_POOL_SIZE))
+            self._async_smtp_pools[loop] = pool
+        return pool
+    
+    async def _acquire_smtp_async(self, pool: asyncio.Queue) -> tuple:
+        """
+        Take a live async connection from the pool, or open a new one
+        
+        Returns:
+            tuple: (client, created_at, messages_sent)
+        """
+        while True:
+            try:
+                client, created_at, messages_sent = pool.get_nowait()
+            except asyncio.QueueEmpty:
+                client = aiosmtplib.SMTP(
+                    hostname=self.smtp_host,
+                    port=self.smtp_port,
+                    username=self.smtp_username,
+                    password=self.smtp_password,
+                    start_tls=self.smtp_use_tls,
+                    timeout=SMTP_TIMEOUT
+                )
+                await client.connect()
+                return client, time.monotonic(), 0
+            
+            if time.monotonic() - created_at < SMTP_CONNECTION_MAX_AGE:
+                try:
+                    if (await client.noop()).code == 250:
+                        return client, created_at, messages_sent
+                except (aiosmtplib.SMTPException, OSError):
+                    pass
+            await self._close_smtp_async(client)
+    
+    async def _release_smtp_async(self, pool: asyncio.Queue, client: "aiosmtplib.SMTP",
+                                  created_at: float, messages_sent: int):
+        """Return an async connection to the pool unless it is due to be retired"""
+        if (messages_sent >= SMTP_MAX_MESSAGES_PER_CONNECTION or
+                time.monotonic() - created_at >= SMTP_CONNECTION_MAX_AGE):
+            await self._close_smtp_async(client)
+            return
+        try:
+            pool.put_nowait((client, created_at, messages_sent))
+        except asyncio.QueueFull:
+            await self._close_smtp_async(client)
+    
+    @staticmethod
+    async def _close_smtp_async(client: "aiosmtplib.SMTP"):
+        """Close an async SMTP connection, ignoring errors from a dead peer"""
+        try:
+            await client.quit()
+        except Exception:
+            client.close()
+    
+    async def aclose(self):
+        """Close the async SMTP connections pooled on the running event loop"""
+        pool = self._async_smtp_pools.pop(asyncio.get_running_loop(), None)
+        if pool is None:
+            return
+        idle = pool[0]
+        while not idle.empty():
+            client, _, _ = idle.get_nowait()
+            await self._close_smtp_async(client)
+    
     def _send_sms(self, to_phone: str, message: str) -> bool:
         """
         Send SMS using configured SMS service
@@ -542,18 +713,28 @@ class NotificationService:
             logger.error(f"Failed to send SMS to {to_phone}: {e}")
             return False
     
+    def _create_twilio_client(self):
+        """Create the shared Twilio client when Twilio SMS is configured"""
+        if not (self.sms_enabled and self.sms_service == "twilio"):
+            return None
+        if not self.twilio_account_sid or not self.twilio_auth_token:
+            return None
+        
+        try:
+            from twilio.rest import Client
+            return Client(self.twilio_account_sid, self.twilio_auth_token)
+        except ImportError:
+            logger.warning("twilio not installed, SMS notifications disabled")
+            return None
+    
     def _send_twilio_sms(self, to_phone: str, message: str) -> bool:
         """Send SMS using Twilio"""
         try:
-            from twilio.rest import Client
-            
-            if not self.twilio_account_sid or not self.twilio_auth_token:
-                logger.warning("Twilio credentials not configured")
+            if self._twilio is None:
+                logger.warning("Twilio client not configured")
                 return False
             
-            client = Client(self.twilio_account_sid, self.twilio_auth_token)
-            
-            message = client.messages.create(
+            message = self._twilio.messages.create(
                 body=message,
                 from_=self.twilio_phone_number,
                 to=to_phone
@@ -571,6 +752,9 @@ class NotificationService:
         """
         Send notification asynchronously
         
+        Email goes out on the event loop through the async SMTP pool; only
+        the blocking SMS client still runs on the thread pool.
+        
         Args:
             notification_type: Type of notification
             recipient: Recipient employee
@@ -580,16 +764,90 @@ class NotificationService:
         Returns:
             Dict[str, bool]: Success status for each channel
         """
-        loop = asyncio.get_event_loop()
-        
-        return await loop.run_in_executor(
-            self.executor,
-            self.send_notification,
-            notification_type,
-            recipient,
-            data,
-            channels
-        )
+        results = {}
+        channels = self._reachable_channels(self._resolve_channels(notification_type, channels), recipient)
+        if not channels:
+            return results
+        common_data = self._build_notification_data(recipient, data)
+        
+        if "email" in channels:
+            results["email"] = await self._send_email_notification_async(
+                notification_type, recipient.email, common_data
+            )
+        
+        if "sms" in channels:
+            loop = asyncio.get_running_loop()
+            results["sms"] = await loop.run_in_executor(
+                self.executor,
+                self._send_sms_notification,
+                notification_type,
+                recipient.phone_number,
+                common_data
+            )
+        
+        if "in_app" in channels:
+            results["in_app"] = self._send_in_app_notification(
+                notification_type, recipient.id, common_data
+            )
+        
+        return results
+    
+    def enqueue_notification(self, notification_type: str, recipient: Employee,
+                             data: Dict[str, Any], channels: List[str] = None) -> bool:
+        """
+        Queue a notification for background delivery
+        
+        With NOTIFICATION_QUEUE_ENABLED the job is pushed to the Celery
+        notifications queue; otherwise, or if the broker is unreachable,
+        the notification is sent inline.
+        
+        Args:
+            notification_type: Type of notification
+            recipient: Recipient employee
+            data: Notification data (must be JSON serializable)
+            channels: List of channels to use (email, sms, in_app)
+            
+        Returns:
+            bool: True if the job was queued or any channel succeeded
+        """
+        if NOTIFICATION_QUEUE_ENABLED:
+            # Stamp the event time now rather than when a worker picks it up
+            data = {"timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"), **data}
+            try:
+                from app.tasks.notifications import send_notification_job
+                send_notification_job.delay(notification_type, recipient.id, data, channels)
+                return True
+            except Exception as e:
+                logger.warning(f"Failed to queue {notification_type} notification, sending inline: {e}")
+        
+        return any(self.send_notification(notification_type, recipient, data, channels).values())
+    
+    async def send_to_many(self, notification_type: str, recipients: List[Employee],
+                           data: Dict[str, Any], channels: List[str] = None) -> List[Any]:
+        """
+        Send the same notification to many recipients concurrently
+        
+        At most NOTIFY_CONCURRENCY sends are in flight at once so a large
+        fan-out does not exhaust the SMTP pool or the SMS thread pool.
+        
+        Args:
+            notification_type: Type of notification
+            recipients: Recipient employees
+            data: Notification data shared by all recipients
+            channels: List of channels to use (email, sms, in_app)
+            
+        Returns:
+            List[Any]: Per-recipient channel results, or the exception raised
+        """
+        semaphore = asyncio.Semaphore(NOTIFY_CONCURRENCY)
+        
+        async def _send_one(recipient: Employee) -> Dict[str, bool]:
+            async with semaphore:
+                return await self.send_notification_async(
+                    notification_type, recipient, data, channels
+                )
+        
+        return await asyncio.gather(*map(_send_one, recipients), return_exceptions=True)
     
     def send_notification(self, notification_type: str, recipient: Employee,
                          data: Dict[str, Any], channels: List[str] = None) -> Dict[str, bool]:
@@ -606,32 +864,18 @@ class NotificationService:
             Dict[str, bool]: Success status for each channel
         """
         results = {}
-        
-        # Get default channels if not specified
+        channels = self._reachable_channels(self._resolve_channels(notification_type, channels), recipient)
         if not channels:
-            prefs = self.notification_preferences.get(notification_type, {})
-            channels = [ch for ch, enabled in prefs.items() if enabled]
-        
-        # Add common data
-        common_data = {
-            "employee_name": recipient.full_name,
-            "employee_id": recipient.employee_id,
-            "company_name": self.company_name,
-            "company_website": self.company_website,
-            "hr_email": self.hr_email,
-            "hr_phone": self.hr_phone,
-            "portal_link": f"{self.company_website}/portal",
-            "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        }
-        common_data.update(data)
+            return results
+        common_data = self._build_notification_data(recipient, data)
         
         # Send through each channel
-        if "email" in channels and recipient.email:
+        if "email" in channels:
             results["email"] = self._send_email_notification(
                 notification_type, recipient.email, common_data
             )
         
-        if "sms" in channels and recipient.phone_number:
+        if "sms" in channels:
             results["sms"] = self._send_sms_notification(
                 notification_type, recipient.phone_number, common_data
             )
@@ -643,69 +887,98 @@ class NotificationService:
         
         return results
     
+    def _resolve_channels(self, notification_type: str, channels: Optional[List[str]]) -> List[str]:
+        """Get default channels for a notification type if not specified"""
+        if channels:
+            return channels
+        prefs = self.notification_preferences.get(notification_type, {})
+        return [ch for ch, enabled in prefs.items() if enabled]
+    
+    def _reachable_channels(self, channels: List[str], recipient: Employee) -> List[str]:
+        """
+        Drop channels that are not configured or the recipient has no address for
+        
+        A disabled or unconfigured channel can never succeed, so it is left
+        out of the results instead of being reported as a failed delivery.
+        """
+        email_configured = bool(self.smtp_username and self.smtp_password)
+        sms_configured = self._twilio is not None
+        return [
+            ch for ch in channels
+            if (ch != "email" or (email_configured and recipient.email))
+            and (ch != "sms" or (sms_configured and recipient.phone_number))
+        ]
+    
+    def _build_notification_data(self, recipient: Employee, data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Merge common recipient and company fields with notification data
+        
+        Bulk senders pass a precomputed "timestamp" in data so it is
+        formatted once per burst rather than once per recipient.
+        """
+        common_data = self._company_data.copy()
+        common_data["employee_name"] = recipient.full_name
+        common_data["employee_id"] = recipient.employee_id
+        if "timestamp" not in data:
+            common_data["timestamp"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        common_data.update(data)
+        return common_data
+    
     def _send_email_notification(self, notification_type: str, email: str, data: Dict[str, Any]) -> bool:
         """Send email notification based on type"""
         try:
-            # Get template and subject based on notification type
-            template_mapping = {
-                "leave_request_submitted": ("leave_request_submitted.html", "Leave Request Submitted"),
-                "leave_request_approved": ("leave_request_approved.html", "Leave Request Approved ✅"),
-                "leave_request_rejected": ("leave_request_rejected.html", "Leave Request Status Update"),
-                "manager_approval_needed": ("manager_approval_needed.html", "Leave Approval Required"),
-                "document_request_completed": ("document_request_completed.html", "Document Ready for Download 📄"),
-                "survey_invitation": ("survey_invitation.html", "Survey Invitation - Your Feedback Matters 📊"),
-                "password_reset": ("password_reset.html", "Password Reset Request 🔐"),
-                "escalation_notification": ("escalation_notification.html", "🚨 HR Escalation Alert - Immediate Attention Required"),
-                "welcome_new_employee": ("welcome_new_employee.html", "Welcome to the Team! 🎉"),
-                "reminder_leave_expiring": ("reminder_leave_expiring.html", "Reminder: Annual Leave Expiring Soon"),
-                "reminder_survey_pending": ("reminder_survey_pending.html", "Reminder: Survey Response Pending")
-            }
-            
-            template_name, subject = template_mapping.get(
-                notification_type, 
-                ("generic_notification.html", "Notification from HR")
-            )
-            
-            # Customize subject with additional data
-            if notification_type == "leave_request_submitted":
-                subject = f"Leave Request {data.get('request_id', '')} Submitted"
-            elif notification_type == "leave_request_approved":
-                subject = f"Leave Request {data.get('request_id', '')} Approved ✅"
-            elif notification_type == "leave_request_rejected":
-                subject = f"Leave Request {data.get('request_id', '')} Status Update"
-            
-            # Load template and render
-            template = self._get_template(template_name)
-            html_content = template.render(**data)
-            
-            # Generate plain text version
-            text_content = self._html_to_text(html_content)
-            
+            subject, html_content, text_content = self._render_email_notification(notification_type, data)
             return self._send_email(email, subject, html_content, text_content)
             
         except Exception as e:
             logger.error(f"Failed to send email notification {notification_type}: {e}")
             return False
     
+    async def _send_email_notification_async(self, notification_type: str, email: str,
+                                             data: Dict[str, Any]) -> bool:
+        """Send email notification based on type without blocking the event loop"""
+        try:
+            subject, html_content, text_content = self._render_email_notification(notification_type, data)
+            return await self._send_email_async(email, subject, html_content, text_content)
+            
+        except Exception as e:
+            logger.error(f"Failed to send email notification {notification_type}: {e}")
+            return False
+    
+    def _render_email_notification(self, notification_type: str,
+                                   data: Dict[str, Any]) -> Tuple[str, str, str]:
+        """
+        Render subject, HTML and plain text bodies for an email notification
+        
+        Returns:
+            Tuple[str, str, str]: (subject, html_content, text_content)
+        """
+        # Get template and subject based on notification type
+        template_name, subject, subject_format = EMAIL_SPECS.get(notification_type, DEFAULT_EMAIL_SPEC)
+        
+        # Customize subject with additional data
+        if subject_format:
+            subject = subject_format.format(request_id=data.get('request_id', ''))
+        
+        # Render HTML and plain text versions
+        html_content, text_content = self._render_template(template_name, data)
+        
+        return subject, html_content, text_content
+    
     def _send_sms_notification(self, notification_type: str, phone: str, data: Dict[str, Any]) -> bool:
         """Send SMS notification based on type"""
         try:
-            # SMS templates (shorter versions)
-            sms_templates = {
-                "leave_request_approved": "✅ Your leave request {request_id} from {start_date} to {end_date} has been approved. Enjoy your time off! - {company_name}",
-                "leave_request_rejected": "Your leave request {request_id} could not be approved. Please contact your manager for details. - {company_name}",
-                "escalation_notification": "🚨 URGENT: Employee {employee_name} needs immediate HR assistance. Please check the HR portal. - {company_name}",
-                "document_request_completed": "📄 Your requested document {document_title} is ready for download. Check your email for details. - {company_name}",
-                "password_reset": "🔐 Password reset requested for your account. Check your email for the reset link. If you didn't request this, contact IT support. - {company_name}",
-                "reminder_survey_pending": "📊 Reminder: Please complete the {survey_title} survey by {deadline}. Your feedback matters! - {company_name}"
-            }
-            
-            template = sms_templates.get(notification_type)
-            if not template:
+            parts = SMS_TEMPLATE_PARTS.get(notification_type)
+            if not parts:
                 return False
             
-            message = template.format(**data)
-            return self._send_sms(phone, message)
+            # Missing placeholders render empty rather than dropping the SMS
+            pieces = []
+            for literal, field, spec in parts:
+                pieces.append(literal)
+                if field is not None:
+                    pieces.append(format(data.get(field, ""), spec))
+            return self._send_sms(phone, "".join(pieces))
             
         except Exception as e:
             logger.error(f"Failed to send SMS notification {notification_type}: {e}")
@@ -723,17 +996,39 @@ class NotificationService:
             logger.error(f"Failed to send in-app notification {notification_type}: {e}")
             return False
     
+    def _send_in_app_notifications(self, notification_type: str, user_ids: List[int],
+                                   data: Dict[str, Any]) -> bool:
+        """
+        Send one in-app notification to many users in a single write
+        
+        Bulk sends deliver the in-app channel here once instead of per
+        recipient, so a persistent store can insert all rows in one batch.
+        """
+        try:
+            # This would integrate with your in-app notification system
+            # For now, we'll just log it
+            logger.info(
+                f"In-app notification {notification_type} for {len(user_ids)} users: "
+                f"{data.get('title', 'Notification')}"
+            )
+            return True
+            
+        except Exception as e:
+            logger.error(f"Failed to send in-app notifications {notification_type}: {e}")
+            return False
+    
     def _html_to_text(self, html_content: str) -> str:
         """Convert HTML content to plain text"""
-        try:
-            from bs4 import BeautifulSoup
+        # Already plain text: nothing to parse
+        if "<" not in html_content:
+            return html_content.strip()
+        if HTMLParser is not None:
+            return HTMLParser(html_content).text(separator=" ", strip=True)
+        if BeautifulSoup is not None:
             soup = BeautifulSoup(html_content, 'html.parser')
             return soup.get_text()
-        except:
-            # Fallback: basic HTML tag removal
-            import re
-            text = re.sub('<[^<]+?>', '', html_content)
-            return text.strip()
+        # Fallback: basic HTML tag removal
+        return _HTML_TAG_RE.sub('', html_content).strip()
     
     # Specific notification methods for different HR events
     
@@ -743,13 +1038,13 @@ class NotificationService:
             data = {
                 "request_id": leave_request.request_id,
                 "leave_type": leave_request.leave_type.name if leave_request.leave_type else "Leave",
-                "start_date": format_date(leave_request.start_date, "display"),
-                "end_date": format_date(leave_request.end_date, "display"),
+                "start_date": format_display_date(leave_request.start_date),
+                "end_date": format_display_date(leave_request.end_date),
                 "total_days": float(leave_request.total_days),
                 "reason": leave_request.reason
             }
             
-            self.send_notification(
+            self.enqueue_notification(
                 "leave_request_submitted",
                 leave_request.employee,
                 data,
@@ -765,15 +1060,15 @@ class NotificationService:
             data = {
                 "request_id": leave_request.request_id,
                 "leave_type": leave_request.leave_type.name if leave_request.leave_type else "Leave",
-                "start_date": format_date(leave_request.start_date, "display"),
-                "end_date": format_date(leave_request.end_date, "display"),
+                "start_date": format_display_date(leave_request.start_date),
+                "end_date": format_display_date(leave_request.end_date),
                 "total_days": float(leave_request.total_days),
                 "approver_name": approver.full_name,
-                "approval_date": format_date(leave_request.approved_date, "display") if leave_request.approved_date else "Today",
+                "approval_date": format_display_date(leave_request.approved_date) if leave_request.approved_date else "Today",
                 "manager_comments": leave_request.manager_comments or ""
             }
             
-            self.send_notification(
+            self.enqueue_notification(
                 "leave_request_approved",
                 leave_request.employee,
                 data,
@@ -789,13 +1084,13 @@ class NotificationService:
             data = {
                 "request_id": leave_request.request_id,
                 "leave_type": leave_request.leave_type.name if leave_request.leave_type else "Leave",
-                "start_date": format_date(leave_request.start_date, "display"),
-                "end_date": format_date(leave_request.end_date, "display"),
+                "start_date": format_display_date(leave_request.start_date),
+                "end_date": format_display_date(leave_request.end_date),
                 "total_days": float(leave_request.total_days),
                 "rejection_reason": leave_request.manager_comments or "Please contact your manager for details"
             }
             
-            self.send_notification(
+            self.enqueue_notification(
                 "leave_request_rejected",
                 leave_request.employee,
                 data,
@@ -816,75 +1111,17 @@ class NotificationService:
                 "employee_name": leave_request.employee.full_name,
                 "employee_id": leave_request.employee.employee_id,
                 "leave_type": leave_request.leave_type.name if leave_request.leave_type else "Leave",
-                "start_date": format_date(leave_request.start_date, "display"),
-                "end_date": format_date(leave_request.end_date, "display"),
+                "start_date": format_display_date(leave_request.start_date),
+                "end_date": format_display_date(leave_request.end_date),
                 "total_days": float(leave_request.total_days),
                 "reason": leave_request.reason,
-                "submitted_date": format_date(leave_request.submitted_date, "display") if leave_request.submitted_date else "Today",
+                "submitted_date": format_display_date(leave_request.submitted_date) if leave_request.submitted_date else "Today",
                 "approval_link": f"{self.company_website}/portal/leave-requests/{leave_request.request_id}"
             }
             
-            # Create manager approval template if it doesn't exist
-            manager_template = """
-<!DOCTYPE html>
-<html>
-<head>
-    <meta charset="UTF-8">
-    <title>Leave Approval Required</title>
-    <style>
-        body { font-family: Arial, sans-serif; line-height: 1.6; color: #333; }
-        .container { max-width: 600px; margin: 0 auto; padding: 20px; }
-        .header { background-color: #FF9800; color: white; padding: 20px; text-align: center; }
-        .content { background-color: #f9f9f9; padding: 20px; }
-        .footer { background-color: #333; color: white; padding: 15px; text-align: center; font-size: 12px; }
-        .details { background-color: white; padding: 15px; margin: 10px 0; border-left: 4px solid #FF9800; }
-        .button { display: inline-block; padding: 12px 25px; background-color: #FF9800; color: white; text-decoration: none; border-radius: 5px; font-weight: bold; }
-        .urgent { color: #FF9800; font-weight: bold; }
-    </style>
-</head>
-<body>
-    <div class="container">
-        <div class="header">
-            <h1>⏰ Leave Approval Required</h1>
-        </div>
-        <div class="content">
-            <p>Dear {{ manager_name }},</p>
-            <p class="urgent">A leave request from your team member requires your approval.</p>
-            
-            <div class="details">
-                <h3>Leave Request Details:</h3>
-                <p><strong>Employee:</strong> {{ employee_name }} ({{ employee_id }})</p>
-                <p><strong>Request ID:</strong> {{ request_id }}</p>
-                <p><strong>Leave Type:</strong> {{ leave_type }}</p>
-                <p><strong>Dates:</strong> {{ start_date }} to {{ end_date }}</p>
-                <p><strong>Total Days:</strong> {{ total_days }}</p>
-                <p><strong>Reason:</strong> {{ reason }}</p>
-                <p><strong>Submitted:</strong> {{ submitted_date }}</p>
-            </div>
-            
-            <p style="text-align: center;">
-                <a href="{{ approval_link }}" class="button">Review & Approve</a>
-            </p>
-            
-            <p>Please review this request at your earliest convenience.</p>
-        </div>
-        <div class="footer">
-            <p>{{ company_name }} HR Department | {{ hr_email }} | {{ hr_phone }}</p>
-        </div>
-    </div>
-</body>
-</html>
-            """
-            
-            # Save template if it doesn't exist
-            template_path = self.template_dir / "manager_approval_needed.html"
-            if not template_path.exists():
-                with open(template_path, 'w', encoding='utf-8') as f:
-                    f.write(manager_template)
-            
             data["manager_name"] = leave_request.manager.full_name
             
-            self.send_notification(
+            self.enqueue_notification(
                 "manager_approval_needed",
                 leave_request.manager,
                 data,
@@ -902,12 +1139,12 @@ class NotificationService:
                 "document_title": document_request.document_title,
                 "document_type": document_request.document_type.value if document_request.document_type else "Document",
                 "processed_by": document_request.assigned_employee.full_name if document_request.assigned_employee else "HR Team",
-                "completion_date": format_date(document_request.completed_at, "display") if document_request.completed_at else "Today",
+                "completion_date": format_display_date(document_request.completed_at) if document_request.completed_at else "Today",
                 "completion_notes": document_request.completion_notes or "",
                 "download_link": f"{self.company_website}/portal/documents/download/{document_request.request_id}" if document_request.generated_file_path else None
             }
             
-            self.send_notification(
+            self.enqueue_notification(
                 "document_request_completed",
                 document_request.employee,
                 data,
@@ -924,12 +1161,12 @@ class NotificationService:
                 "survey_title": survey.title,
                 "survey_description": survey.description or "Please participate in this important survey",
                 "estimated_duration": survey.estimated_duration or 10,
-                "deadline": format_date(survey.end_date, "display") if survey.end_date else "Soon",
+                "deadline": format_display_date(survey.end_date) if survey.end_date else "Soon",
                 "is_anonymous": survey.is_anonymous,
                 "survey_link": f"{self.company_website}/portal/surveys/{survey.id}/respond"
             }
             
-            self.send_notification(
+            self.enqueue_notification(
                 "survey_invitation",
                 employee,
                 data,
@@ -947,7 +1184,7 @@ class NotificationService:
                 "reset_link": reset_link
             }
             
-            self.send_notification(
+            self.enqueue_notification(
                 "password_reset",
                 employee,
                 data,
@@ -961,75 +1198,134 @@ class NotificationService:
         """Send escalation notification to HR"""
         try:
             # Find HR personnel to notify
-            from sqlalchemy.orm import Session
-            from app.config.database import SessionLocal
+            hr_employees = self._get_escalation_recipients()
             
-            db = SessionLocal()
-            try:
-                hr_employees = db.query(Employee).join(Employee.role).filter(
-                    Employee.role.has(title="HR Manager")
-                ).all()
-                
-                if not hr_employees:
-                    # Fallback to any HR department employee
-                    hr_employees = db.query(Employee).join(Employee.department).filter(
-                        Employee.department.has(name="Human Resources")
-                    ).all()
-                
-                data = {
-                    "query_text": query_log.user_query[:200] + "..." if len(query_log.user_query) > 200 else query_log.user_query,
-                    "escalation_reason": query_log.escalation_reason or "Low AI confidence",
-                    "confidence_score": float(query_log.confidence_score) if query_log.confidence_score else 0,
-                    "sentiment": query_log.user_sentiment.value if query_log.user_sentiment else "Unknown"
-                }
-                
-                for hr_employee in hr_employees:
-                    self.send_notification(
-                        "escalation_notification",
-                        hr_employee,
-                        data,
-                        ["email", "sms", "in_app"]
-                    )
-                    
-            finally:
-                db.close()
+            query_text = query_log.user_query or ""
+            data = {
+                "query_text": query_text[:200] + "..." if len(query_text) > 200 else query_text,
+                "escalation_reason": query_log.escalation_reason or "Low AI confidence",
+                "confidence_score": float(query_log.confidence_score) if query_log.confidence_score else 0,
+                "sentiment": query_log.user_sentiment.value if query_log.user_sentiment else "Unknown"
+            }
+            
+            for hr_employee in hr_employees:
+                self.enqueue_notification(
+                    "escalation_notification",
+                    hr_employee,
+                    data,
+                    ["email", "sms", "in_app"]
+                )
                 
         except Exception as e:
             logger.error(f"Failed to send escalation notification: {e}")
     
-    def send_bulk_notifications(self, employees: List[Employee], notification_type: str, data: Dict[str, Any]):
-        """Send notifications to multiple employees"""
+    def _get_escalation_recipients(self) -> List[Employee]:
+        """
+        Get the HR staff who receive escalations, cached for a few minutes
+        
+        The employees are returned detached with their columns loaded, which
+        is all the notification channels read.
+        """
+        with self._escalation_recipients_lock:
+            cached = self._escalation_recipients
+        if cached is not None and cached[0] > time.monotonic():
+            return cached[1]
+        
+        db = SessionLocal()
+        try:
+            hr_employees = db.query(Employee).join(Employee.role).filter(
+                Employee.role.has(title="HR Manager")
+            ).all()
+            
+            if not hr_employees:
+                # Fallback to any HR department employee
+                hr_employees = db.query(Employee).join(Employee.department).filter(
+                    Employee.department.has(name="Human Resources")
+                ).all()
+        finally:
+            db.close()
+        
+        # An empty result is not cached so newly added HR staff are picked up
+        if hr_employees:
+            with self._escalation_recipients_lock:
+                self._escalation_recipients = (
+                    time.monotonic() + ESCALATION_RECIPIENTS_CACHE_TTL, hr_employees
+                )
+        return hr_employees
+    
+    async def send_bulk_notifications_async(self, employees: List[Employee], notification_type: str,
+                                            data: Dict[str, Any]) -> int:
+        """
+        Send notifications to multiple employees on the running event loop
+        
+        Emails share the loop's pooled SMTP connections, which stay open for
+        later bursts and are closed on application shutdown.
+        
+        Args:
+            employees: Recipient employees
+            notification_type: Type of notification
+            data: Notification data shared by all recipients
+            
+        Returns:
+            int: Number of employees notified on at least one channel
+        """
         try:
             logger.info(f"Sending bulk {notification_type} notifications to {len(employees)} employees")
             
-            # Send notifications asynchronously
-            tasks = []
-            for employee in employees:
-                task = self.send_notification_async(notification_type, employee, data)
-                tasks.append(task)
+            # In-app notifications are written once for all recipients;
+            # the remaining channels go out per employee
+            channels = self._resolve_channels(notification_type, None)
+            per_employee_channels = [ch for ch in channels if ch != "in_app"]
+            in_app_sent = False
+            if "in_app" in channels:
+                in_app_sent = self._send_in_app_notifications(
+                    notification_type, [employee.id for employee in employees], data
+                )
+            
+            # Format the timestamp once for the whole burst
+            data = {"timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"), **data}
+            
+            results = []
+            if per_employee_channels:
+                results = await self.send_to_many(
+                    notification_type, employees, data, per_employee_channels
+                )
+            successful = (len(employees) if in_app_sent else
+                          sum(1 for result in results
+                              if isinstance(result, dict) and any(result.values())))
+            logger.info(f"Bulk notification completed: {successful}/{len(employees)} successful")
+            return successful
             
-            # Wait for all notifications to complete
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            try:
-                results = loop.run_until_complete(asyncio.gather(*tasks))
-                successful = sum(1 for result in results if any(result.values()))
-                logger.info(f"Bulk notification completed: {successful}/{len(employees)} successful")
-            finally:
-                loop.close()
-                
         except Exception as e:
             logger.error(f"Failed to send bulk notifications: {e}")
+            return 0
+    
+    def send_bulk_notifications(self, employees: List[Employee], notification_type: str, data: Dict[str, Any]):
+        """
+        Send notifications to multiple employees from synchronous code
+        
+        The sends run on the shared background loop and this call blocks
+        until they finish, so async callers should await
+        send_bulk_notifications_async instead.
+        """
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            pass
+        else:
+            logger.error("send_bulk_notifications called from a running event loop; "
+                         "await send_bulk_notifications_async instead")
+            return
+        
+        future = asyncio.run_coroutine_threadsafe(
+            self.send_bulk_notifications_async(employees, notification_type, data),
+            self._get_background_loop()
+        )
+        future.result()
     
     def send_reminder_notifications(self):
         """Send various reminder notifications (to be called by scheduler)"""
         try:
-            from sqlalchemy.orm import Session
-            from app.config.database import SessionLocal
-            from app.models.leave import LeaveBalance
-            from app.models.survey import Survey, SurveyResponse
-            from datetime import date, timedelta
-            
             db = SessionLocal()
             try:
                 # Remind about expiring leave balances
@@ -1049,22 +1345,24 @@ class NotificationService:
     def _send_leave_expiry_reminders(self, db: Session):
         """Send reminders for leave balances expiring soon"""
         try:
-            from sqlalchemy import and_
-            
             current_year = date.today().year
             
-            # Find employees with significant unused leave
-            leave_balances = db.query(LeaveBalance).filter(
+            # Find employees with significant unused leave that does not carry
+            # forward; leave type and employee load in the same query
+            leave_balances = db.query(LeaveBalance).join(LeaveBalance.leave_type).options(
+                contains_eager(LeaveBalance.leave_type),
+                joinedload(LeaveBalance.employee)
+            ).filter(
                 and_(
                     LeaveBalance.year == current_year,
-                    LeaveBalance.available_days > 5  # More than 5 days remaining
+                    # available_days, computed in SQL: more than 5 days remaining
+                    LeaveBalance.allocated_days + LeaveBalance.carry_forward_days
+                    - LeaveBalance.used_days - LeaveBalance.pending_days > 5,
+                    or_(LeaveType.is_carry_forward == False, LeaveType.is_carry_forward.is_(None))
                 )
-            ).all()
+            ).yield_per(200)  # Stream rows rather than loading every balance up front
             
             for balance in leave_balances:
-                if balance.leave_type.is_carry_forward:
-                    continue  # Skip if carry forward is allowed
-                
                 data = {
                     "leave_type": balance.leave_type.name,
                     "available_days": balance.available_days,
@@ -1085,45 +1383,54 @@ class NotificationService:
     def _send_survey_reminders(self, db: Session):
         """Send reminders for pending surveys"""
         try:
-            from sqlalchemy import and_
-            
             # Find active surveys ending soon
             reminder_date = date.today() + timedelta(days=3)
             
-            active_surveys = db.query(Survey).filter(
+            # Active employees (targeting simplified here) without a response to
+            # each such survey, ranked so each survey is capped to avoid spam
+            rank = func.row_number().over(partition_by=Survey.id, order_by=Employee.id)
+            pending = select(
+                Survey.id.label("survey_id"),
+                Employee.id.label("employee_id"),
+                rank.label("reminder_rank")
+            ).select_from(Survey).join(Employee, true()).where(
                 and_(
-                    Survey.status == "active",
+                    Survey.status == SurveyStatus.ACTIVE,
                     Survey.end_date >= date.today(),
-                    Survey.end_date <= reminder_date
+                    Survey.end_date <= reminder_date,
+                    Employee.is_active == True,
+                    ~exists().where(and_(
+                        SurveyResponse.survey_id == Survey.id,
+                        SurveyResponse.employee_id == Employee.id
+                    ))
                 )
-            ).all()
-            
-            for survey in active_surveys:
-                # Find employees who haven't responded
-                responded_employee_ids = db.query(SurveyResponse.employee_id).filter(
-                    SurveyResponse.survey_id == survey.id
-                ).distinct().all()
-                
-                responded_ids = [r[0] for r in responded_employee_ids if r[0]]
+            ).subquery()
+            
+            # One round trip per run, and no rows at all when there is no work
+            pending_reminders = db.query(Survey, Employee).select_from(Survey).join(
+                pending, pending.c.survey_id == Survey.id
+            ).join(
+                Employee, Employee.id == pending.c.employee_id
+            ).filter(
+                pending.c.reminder_rank <= SURVEY_REMINDER_LIMIT
+            ).order_by(Survey.id).yield_per(200)
+            
+            survey_data: Dict[int, Dict[str, Any]] = {}
+            for survey, employee in pending_reminders:
+                data = survey_data.get(survey.id)
+                if data is None:
+                    data = survey_data[survey.id] = {
+                        "survey_title": survey.title,
+                        "deadline": format_display_date(survey.end_date) if survey.end_date else "Soon"
+                    }
                 
-                # Get all employees (based on targeting - simplified here)
-                all_employees = db.query(Employee).filter(Employee.is_active == True).all()
-                
-                pending_employees = [emp for emp in all_employees if emp.id not in responded_ids]
-                
-                data = {
-                    "survey_title": survey.title,
-                    "deadline": format_date(survey.end_date, "display") if survey.end_date else "Soon"
-                }
+                self.send_notification(
+                    "reminder_survey_pending",
+                    employee,
+                    data,
+                    ["email", "in_app"]
+                )
                 
-                for employee in pending_employees[:50]:  # Limit to avoid spam
-                    self.send_notification(
-                        "reminder_survey_pending",
-                        employee,
-                        data,
-                        ["email", "in_app"]
-                    )
-                    
         except Exception as e:
             logger.error(f"Failed to send survey reminders: {e}")
     
@@ -1181,16 +1488,14 @@ class NotificationService:
             # Check email configuration
             if self.smtp_username and self.smtp_password:
                 try:
-                    with smtplib.SMTP(self.smtp_host, self.smtp_port) as server:
-                        if self.smtp_use_tls:
-                            server.starttls()
-                        server.login(self.smtp_username, self.smtp_password)
-                        status["email_service"] = True
+                    server, created_at, messages_sent = self._acquire_smtp()
+                    self._release_smtp(server, created_at, messages_sent)
+                    status["email_service"] = True
                 except:
                     pass
             
             # Check SMS configuration
-            if self.sms_enabled and self.twilio_account_sid and self.twilio_auth_token:
+            if self._twilio is not None:
                 status["sms_service"] = True
             
             # Check templates
@@ -44,6 +44,10 @@ class RAGService:
         # OpenSearch client
         self.client = None
         self.index_name = opensearch_config.index_name
+        
+        # Bumped whenever indexed content changes so callers can invalidate
+        # anything derived from search results
+        self.index_version = 0
     
     def _get_client(self) -> OpenSearch:
         """Get OpenSearch client instance"""
@@ -187,6 +191,7 @@ class RAGService:
                 if response.get("result") not in ["created", "updated"]:
                     logger.warning(f"Unexpected response for document {doc_id}: {response}")
             
+            self.index_version += 1
             logger.info(f"Successfully indexed document {document.id} with {len(chunks)} chunks")
             return True
             
@@ -223,6 +228,7 @@ class RAGService:
             for hit in response["hits"]["hits"]:
                 client.delete(index=self.index_name, id=hit["_id"])
             
+            self.index_version += 1
             logger.info(f"Removed document {document_id} from index")
             return True
             
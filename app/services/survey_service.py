@@ -5,6 +5,8 @@ This service handles survey creation, response collection, and engagement analyt
 """
 
 import json
+import heapq
+from operator import itemgetter
 from datetime import datetime, timedelta
 from typing import List, Dict, Any, Optional, Tuple
 from sqlalchemy.orm import Session
@@ -399,7 +401,7 @@ class SurveyService:
                     keywords[word] = keywords.get(word, 0) + 1
         
         # Return top 10 keywords
-        return dict(sorted(keywords.items(), key=lambda x: x[1], reverse=True)[:10])
+        return dict(heapq.nlargest(10, keywords.items(), key=itemgetter(1)))
     
     def _get_demographic_breakdown(self, db: Session, survey_id: int) -> Dict[str, Any]:
         """Get demographic breakdown of survey responses"""
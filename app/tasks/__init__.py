@@ -0,0 +1,5 @@
+"""
+Background tasks for the HR AI Assistant.
+
+Tasks run in Celery workers configured by ``app.config.celery_app``.
+"""
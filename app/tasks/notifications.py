@@ -0,0 +1,67 @@
+"""
+Notification delivery tasks.
+
+NotificationService.enqueue_notification pushes jobs here so request
+handlers only pay for a Redis write; workers reload the recipient and send
+through the regular notification channels, retrying failed email/SMS
+deliveries with back-off.
+"""
+
+import os
+from typing import Dict, Any, List, Optional
+
+from app.config.celery_app import celery_app
+from app.config.database import SessionLocal
+from app.models.employee import Employee
+from app.services.notification_service import notification_service
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Seconds to wait before each retry of a failed email/SMS delivery
+NOTIFICATION_RETRY_DELAYS = [
+    int(delay) for delay in os.getenv("NOTIFICATION_RETRY_DELAYS", "10,60,300").split(",")
+]
+
+# Channels that talk to external providers and are worth retrying
+RETRYABLE_CHANNELS = ("email", "sms")
+
+
+@celery_app.task(bind=True, max_retries=len(NOTIFICATION_RETRY_DELAYS))
+def send_notification_job(self, notification_type: str, employee_id: int,
+                          data: Dict[str, Any], channels: Optional[List[str]] = None) -> Dict[str, bool]:
+    """
+    Deliver a queued notification
+    
+    Args:
+        notification_type: Type of notification
+        employee_id: Primary key of the recipient employee
+        data: Notification data
+        channels: List of channels to use (email, sms, in_app)
+        
+    Returns:
+        Dict[str, bool]: Success status for each channel
+    """
+    db = SessionLocal()
+    try:
+        employee = db.get(Employee, employee_id)
+        if employee is None:
+            logger.warning(f"Dropping {notification_type} notification: employee {employee_id} not found")
+            return {}
+        
+        results = notification_service.send_notification(notification_type, employee, data, channels)
+    finally:
+        db.close()
+    
+    # Retry only the delivery channels that failed; in-app is recorded locally
+    # and channels that succeeded must not be sent twice. Disabled or
+    # unconfigured channels never appear in results, so a False here is a
+    # delivery error rather than a permanent skip
+    failed_channels = [channel for channel in RETRYABLE_CHANNELS if results.get(channel) is False]
+    if failed_channels:
+        delay = NOTIFICATION_RETRY_DELAYS[min(self.request.retries, len(NOTIFICATION_RETRY_DELAYS) - 1)]
+        logger.warning(f"{notification_type} notification to employee {employee_id} failed on "
+                       f"{', '.join(failed_channels)}, retrying in {delay}s")
+        raise self.retry(args=(notification_type, employee_id, data, failed_channels), countdown=delay)
+    
+    return results
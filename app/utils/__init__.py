@@ -7,7 +7,7 @@ and validation utilities used throughout the application.
 
 from .logger import setup_logging, get_logger
 from .helpers import (
-    generate_unique_id, format_date, format_currency, 
+    generate_unique_id, format_date, format_display_date, format_currency, 
     calculate_business_days, send_email, hash_file,
     sanitize_filename, extract_keywords
 )
@@ -21,6 +21,7 @@ __all__ = [
     "get_logger",
     "generate_unique_id",
     "format_date", 
+    "format_display_date",
     "format_currency",
     "calculate_business_days",
     "send_email",
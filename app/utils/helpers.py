@@ -8,6 +8,8 @@ for common operations like date formatting, file handling, and data processing.
 import os
 import re
 import hashlib
+import heapq
+from operator import itemgetter
 import secrets
 import smtplib
 from datetime import datetime, date, timedelta
@@ -16,6 +18,7 @@ from pathlib import Path
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 import unicodedata
+from functools import lru_cache
 
 def generate_unique_id(prefix: str = "", length: int = 8) -> str:
     """
@@ -31,6 +34,14 @@ def generate_unique_id(prefix: str = "", length: int = 8) -> str:
     random_part = secrets.token_hex(length)[:length].upper()
     return f"{prefix}{random_part}" if prefix else random_part
 
+DATE_FORMATS = {
+    "display": "%B %d, %Y",           # January 15, 2024
+    "short": "%m/%d/%Y",              # 01/15/2024
+    "api": "%Y-%m-%d",                # 2024-01-15
+    "filename": "%Y%m%d",             # 20240115
+    "verbose": "%A, %B %d, %Y"        # Monday, January 15, 2024
+}
+
 def format_date(date_obj: Union[date, datetime], format_type: str = "display") -> str:
     """
     Format date for display or API usage.
@@ -48,15 +59,33 @@ def format_date(date_obj: Union[date, datetime], format_type: str = "display") -
     if isinstance(date_obj, datetime):
         date_obj = date_obj.date()
     
-    formats = {
-        "display": "%B %d, %Y",           # January 15, 2024
-        "short": "%m/%d/%Y",              # 01/15/2024
-        "api": "%Y-%m-%d",                # 2024-01-15
-        "filename": "%Y%m%d",             # 20240115
-        "verbose": "%A, %B %d, %Y"        # Monday, January 15, 2024
-    }
+    if format_type == "display":
+        return _format_display_date(date_obj)
+    return date_obj.strftime(DATE_FORMATS.get(format_type, DATE_FORMATS["display"]))
+
+def format_display_date(date_obj: Union[date, datetime, None]) -> str:
+    """
+    Format date for display, e.g. "January 15, 2024".
     
-    return date_obj.strftime(formats.get(format_type, formats["display"]))
+    Same output as format_date(date_obj, "display") without the format
+    dispatch; repeated dates are served from a cache.
+    
+    Args:
+        date_obj: Date or datetime object
+        
+    Returns:
+        str: Formatted date string, empty if no date
+    """
+    if not date_obj:
+        return ""
+    if isinstance(date_obj, datetime):
+        date_obj = date_obj.date()
+    return _format_display_date(date_obj)
+
+@lru_cache(maxsize=4096)
+def _format_display_date(date_obj: date) -> str:
+    """Format a plain date for display; cached because notifications repeat dates"""
+    return date_obj.strftime(DATE_FORMATS["display"])
 
 def format_currency(amount: float, currency: str = "INR", include_symbol: bool = True) -> str:
     """
@@ -301,9 +330,9 @@ def extract_keywords(text: str, min_length: int = 3, max_keywords: int = 20) ->
     for word in filtered_words:
         word_freq[word] = word_freq.get(word, 0) + 1
     
-    # Sort by frequency and return top keywords
-    keywords = sorted(word_freq.items(), key=lambda x: x[1], reverse=True)
-    return [word for word, freq in keywords[:max_keywords]]
+    # Select the most frequent keywords without sorting the whole vocabulary
+    keywords = heapq.nlargest(max_keywords, word_freq.items(), key=itemgetter(1))
+    return [word for word, freq in keywords]
 
 def truncate_text(text: str, max_length: int, suffix: str = "...") -> str:
     """
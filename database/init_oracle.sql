@@ -271,6 +271,8 @@ CREATE INDEX idx_leave_requests_employee ON leave_requests(employee_id);
 CREATE INDEX idx_leave_requests_dates ON leave_requests(start_date, end_date);
 CREATE INDEX idx_leave_requests_status ON leave_requests(status);
 CREATE INDEX idx_leave_requests_manager ON leave_requests(manager_id);
+CREATE INDEX idx_leave_requests_emp_status_dates ON leave_requests(employee_id, status, start_date, end_date);
+CREATE INDEX idx_leave_requests_emp_type_status ON leave_requests(employee_id, leave_type_id, status, start_date);
 
 -- =============================================================================
 -- DOCUMENTS TABLE
@@ -287,6 +289,7 @@ CREATE TABLE documents (
     file_size NUMBER,
     file_extension VARCHAR2(10),
     mime_type VARCHAR2(100),
+    content_hash VARCHAR2(32),
     
     -- Content and metadata
     content_text CLOB,
@@ -341,6 +344,7 @@ CREATE INDEX idx_documents_status ON documents(status);
 CREATE INDEX idx_documents_author ON documents(author_id);
 CREATE INDEX idx_documents_active ON documents(is_active);
 CREATE INDEX idx_documents_searchable ON documents(is_searchable);
+CREATE INDEX idx_documents_content_hash ON documents(content_hash);
 
 -- =============================================================================
 -- DOCUMENT REQUESTS TABLE
@@ -400,6 +404,9 @@ CREATE TABLE document_requests (
     CONSTRAINT fk_doc_requests_approver FOREIGN KEY (approver_id) REFERENCES employees(id)
 );
 
+-- Sequence for document request IDs (DR + YYYYMMDD + 8-digit value)
+CREATE SEQUENCE document_request_seq START WITH 1 INCREMENT BY 1 CACHE 20;
+
 -- Indexes for document requests
 CREATE INDEX idx_doc_requests_req_id ON document_requests(request_id);
 CREATE INDEX idx_doc_requests_employee ON document_requests(employee_id);